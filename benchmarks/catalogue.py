@@ -0,0 +1,120 @@
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ["river", "night", "garden", "stone", "winter", "glass", "empire", "shadow", "letters", "house",
+         "silent", "golden", "last", "secret", "city", "ocean", "storm", "memory", "crown", "forest"]
+
+QUERIES = [
+    {},
+    {"genre_id": 3},
+    {"genre_id": 7, "sort_by": "price", "sort_order": "desc"},
+    {"min_price": 200, "max_price": 400, "sort_by": "price"},
+    {"is_available": False, "sort_by": "quantity", "sort_order": "desc"},
+    {"genre_id": 5, "min_price": 500, "skip": 200, "limit": 50},
+]
+
+def seed(db, books: int, genres: int, seed_value: int):
+    import models
+
+    rng = random.Random(seed_value)
+    db.execute(models.Genre.__table__.insert(), [{"id": genre_id, "name": f"Genre {genre_id}"} for genre_id in range(1, genres + 1)])
+    batch = []
+    for book_id in range(1, books + 1):
+        batch.append({
+            "id": book_id,
+            "title": " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 3))) + f" {book_id % 5000}",
+            "author": f"Author {rng.randint(1, books // 20 + 1)}",
+            "genre_id": rng.randint(1, genres),
+            "price": rng.randint(100, 1000),
+            "instock": rng.random() > 0.05,
+            "quantity": rng.randint(0, 40)
+        })
+        if len(batch) == 20000:
+            db.execute(models.Book.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.execute(models.Book.__table__.insert(), batch)
+    db.commit()
+
+def measure_memory(function):
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+def best_of(repeat: int, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the in-memory catalogue projection with the ORM path for book listings")
+    parser.add_argument("--books", type=int, default=200000)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'catalogue.db')}"
+        import models
+        from database import SessionLocal, create_schema
+        from routers.book import _query_books
+        from utils.catalogue import CatalogueProjection
+
+        create_schema()
+        db = SessionLocal()
+        seed(db, args.books, args.genres, args.seed)
+
+        orm_books, orm_current, orm_peak = measure_memory(lambda: db.query(models.Book).all())
+        del orm_books
+        db.expunge_all()
+        projection = CatalogueProjection("catalogue_benchmark", check_seconds=10 ** 9, settle_seconds=60)
+        _, projection_current, projection_peak = measure_memory(lambda: projection.snapshot(db))
+
+        print(f"{args.books} books")
+        print(f"{'memory':<12}{'ORM instances':>16}{'projection':>14}")
+        print(f"{'retained':<12}{orm_current / 2 ** 20:>14.1f}MB{projection_current / 2 ** 20:>12.1f}MB")
+        print(f"{'peak':<12}{orm_peak / 2 ** 20:>14.1f}MB{projection_peak / 2 ** 20:>12.1f}MB")
+        print(f"projection arrays and interned titles: {projection.memory_bytes() / 2 ** 20:.1f}MB")
+        print()
+
+        sort_columns = {book_id: {"price": price, "quantity": quantity}
+                        for book_id, price, quantity in db.query(models.Book.id, models.Book.price, models.Book.quantity)}
+        print(f"{'query':<64}{'ORM':>10}{'projection':>13}")
+        for query in QUERIES:
+            params = {"genre_id": None, "min_price": None, "max_price": None, "is_available": True,
+                      "sort_by": "title", "sort_order": "asc", "skip": 0, "limit": 10, **query}
+
+            def orm_path():
+                books = _query_books(db, None, **params)
+                db.expunge_all()
+                return [(book.id, book.title) for book in books]
+
+            orm_time, expected = best_of(args.repeat, orm_path)
+            projection_time, books = best_of(args.repeat, lambda: [(book["id"], book["title"]) for book in projection.browse(projection.snapshot(db), **params)])
+            if params["sort_by"] == "title":
+                sort_values = lambda book: book[1]
+            else:
+                sort_values = lambda book: sort_columns[book[0]][params["sort_by"]]
+            assert [sort_values(book) for book in books] == [sort_values(book) for book in expected], f"results differ for {query}"
+            label = ", ".join(f"{key}={value}" for key, value in query.items()) or "default listing"
+            print(f"{label:<64}{orm_time * 1000:>8.2f}ms{projection_time * 1000:>11.2f}ms")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.compression import ENCODINGS, compress, render_json
+
+WORDS = ["river", "night", "garden", "stone", "winter", "glass", "empire", "shadow", "letters", "house",
+         "silent", "golden", "last", "secret", "city", "ocean", "storm", "memory", "crown", "forest"]
+
+def catalogue_page(rng, size: int):
+    return [{"id": rng.randint(1, 10 ** 6), "title": " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))}
+            for _ in range(size)]
+
+def order_export(rng, size: int):
+    return [{"id": order_id, "user_id": rng.randint(1, size // 10 + 1), "total_amount": rng.randint(100, 50000)}
+            for order_id in range(1, size + 1)]
+
+def user_export(rng, size: int):
+    def password_hash():
+        salt = base64.b64encode(rng.randbytes(16)).decode().rstrip("=")
+        digest = base64.b64encode(rng.randbytes(32)).decode().rstrip("=")
+        return f"$argon2id$v=19$m=65536,t=3,p=4${salt}${digest}"
+
+    return [{"id": user_id, "name": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}",
+             "email": f"user{user_id}@example.com", "password": password_hash(), "is_verified": True,
+             "role": rng.choice(["Customer"] * 8 + ["Staff", "Admin"])}
+            for user_id in range(1, size + 1)]
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        import zlib
+        return zlib.decompress(data, 31)
+    if encoding == "br":
+        import brotli
+        return brotli.decompress(data)
+    import zstandard
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+def best_of(repeat: int, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        result = function()
+        timings.append(time.process_time() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response sizes and CPU cost of each compression encoding on API payload shapes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payloads = [
+        ("catalogue page, 10 books", catalogue_page(rng, 10)),
+        ("catalogue page, 100 books", catalogue_page(rng, 100)),
+        ("catalogue page, 1000 books", catalogue_page(rng, 1000)),
+        ("/order/getallorders, 10k orders", order_export(rng, 10000)),
+        ("/user/all, 1k users", user_export(rng, 1000)),
+    ]
+
+    print(f"encodings available: {', '.join(ENCODINGS)}")
+    print(f"{'payload':<34}{'encoding':<22}{'bytes':>10}{'ratio':>8}{'compress':>11}{'decompress':>12}")
+    for name, content in payloads:
+        body = render_json(content)
+        print(f"{name:<34}{'identity':<22}{len(body):>10}{1:>8.2f}{'-':>11}{'-':>12}")
+        for encoding in ENCODINGS:
+            for cached in (False, True):
+                seconds, data = best_of(args.repeat, lambda: compress(body, encoding, cached=cached))
+                unpack_seconds, restored = best_of(args.repeat, lambda: decompress(data, encoding))
+                assert restored == body
+                label = f"{encoding} ({'cached' if cached else 'per request'})"
+                print(f"{'':<34}{label:<22}{len(data):>10}{len(body) / len(data):>8.2f}"
+                      f"{seconds * 1000:>9.2f}ms{unpack_seconds * 1000:>10.2f}ms")
+    print("Cached entries are compressed once per catalogue generation and served from memory on later hits.")
+
+if __name__ == "__main__":
+    main()
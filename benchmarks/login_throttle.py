@@ -0,0 +1,119 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+def make_attempts(accounts: int, attempts: int, attacker_ips: int, legit_share: float, seed: int):
+    rng = random.Random(seed)
+    plan = []
+    for attempt in range(attempts):
+        if rng.random() < legit_share:
+            user = rng.randrange(accounts)
+            plan.append((f"user{user}@example.com", f"correct-{user}", f"198.51.100.{rng.randrange(1, 255)}", True))
+        elif rng.random() < 0.6:
+            plan.append((f"user{rng.randrange(accounts)}@example.com", f"guess-{attempt}", f"203.0.113.{rng.randrange(attacker_ips)}", False))
+        else:
+            plan.append((f"leaked{attempt}@example.org", f"guess-{attempt}", f"203.0.113.{rng.randrange(attacker_ips)}", False))
+    return plan
+
+def run(plan, throttle, clock, interval: float):
+    import routers.user as user_router
+    from database import SessionLocal
+    from fastapi import HTTPException
+
+    counters = {"lookups": 0, "verifications": 0, "throttled": 0, "legit_ok": 0, "legit_total": 0}
+    verify_password = user_router.verify_password
+
+    def counting_verify(plain_password, hashed_password):
+        counters["verifications"] += 1
+        return verify_password(plain_password, hashed_password)
+
+    original_query = SessionLocal.class_.query
+
+    def counting_query(session, *entities, **kwargs):
+        counters["lookups"] += 1
+        return original_query(session, *entities, **kwargs)
+
+    user_router.login_throttle = throttle
+    user_router.verify_password = counting_verify
+    SessionLocal.class_.query = counting_query
+    db = SessionLocal()
+    started = time.process_time()
+    try:
+        for email, password, client_ip, legit in plan:
+            clock.now += interval
+            request = SimpleNamespace(client=SimpleNamespace(host=client_ip))
+            form = SimpleNamespace(username=email, password=password)
+            counters["legit_total"] += legit
+            try:
+                user_router.login_user(request, form, db)
+                counters["legit_ok"] += legit
+            except HTTPException as exc:
+                counters["throttled"] += exc.status_code == 429
+    finally:
+        elapsed = time.process_time() - started
+        db.close()
+        user_router.verify_password = verify_password
+        SessionLocal.class_.query = original_query
+    return elapsed, counters
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CPU spent on /user/login under a simulated credential-stuffing run")
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--attempts", type=int, default=300)
+    parser.add_argument("--attacker-ips", type=int, default=8)
+    parser.add_argument("--legit-share", type=float, default=0.02)
+    parser.add_argument("--rate", type=float, default=20.0, help="Attempts per simulated second")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'login.db')}"
+        import models
+        from config import settings
+        from database import SessionLocal, create_schema
+        from hashing import hash_password
+        from utils.login_throttle import LoginThrottle
+
+        create_schema()
+        db = SessionLocal()
+        db.add_all([
+            models.User(name=f"User {user}", email=f"user{user}@example.com", password=hash_password(f"correct-{user}"),
+                        is_verified=True, role="Customer")
+            for user in range(args.accounts)
+        ])
+        db.commit()
+        db.close()
+
+        plan = make_attempts(args.accounts, args.attempts, args.attacker_ips, args.legit_share, args.seed)
+        results = {}
+        for name, limits in (("unthrottled", (10 ** 9, 10 ** 9)),
+                             ("throttled", (settings.LOGIN_ACCOUNT_MAX_FAILURES, settings.LOGIN_IP_MAX_FAILURES))):
+            clock = SimulatedClock()
+            throttle = LoginThrottle(settings.LOGIN_THROTTLE_SLOTS, *limits, settings.LOGIN_BACKOFF_BASE_SECONDS,
+                                     settings.LOGIN_BACKOFF_MAX_SECONDS, settings.LOGIN_FAILURE_RESET_SECONDS, clock=clock)
+            results[name] = run(plan, throttle, clock, 1 / args.rate)
+
+    print(f"{args.attempts} login attempts at {args.rate:.0f}/s from {args.attacker_ips} attacker IPs against {args.accounts} accounts")
+    print(f"{'mode':<14}{'CPU':>9}{'per attempt':>14}{'user lookups':>14}{'argon2':>9}{'throttled':>11}{'legit ok':>11}")
+    for name, (cpu, counters) in results.items():
+        print(f"{name:<14}{cpu:>8.2f}s{cpu / args.attempts * 1000:>12.2f}ms{counters['lookups']:>14}{counters['verifications']:>9}"
+              f"{counters['throttled']:>11}{counters['legit_ok']:>6}/{counters['legit_total']}")
+    baseline = results["unthrottled"][0]
+    print(f"CPU saved: {(1 - results['throttled'][0] / baseline) * 100:.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pricing import BASIS_POINTS, DISCOUNT, TAX, PriceRules, quote_carts
+
+def make_rules(books: int, genres: int, seed: int):
+    rng = random.Random(seed)
+    rules = [SimpleNamespace(kind=DISCOUNT, book_id=book_id, genre_id=None, code=None, percent_bp=rng.choice([500, 1000, 1500]))
+             for book_id in rng.sample(range(1, books + 1), books // 20)]
+    rules += [SimpleNamespace(kind=DISCOUNT, book_id=None, genre_id=genre_id, code=None, percent_bp=rng.choice([250, 750]))
+              for genre_id in rng.sample(range(1, genres + 1), genres // 3)]
+    rules += [SimpleNamespace(kind=DISCOUNT, book_id=None, genre_id=genre_id, code="SPRING", percent_bp=2000)
+              for genre_id in rng.sample(range(1, genres + 1), genres // 4)]
+    rules += [SimpleNamespace(kind=TAX, book_id=None, genre_id=None, code=None, percent_bp=500)]
+    rules += [SimpleNamespace(kind=TAX, book_id=None, genre_id=genre_id, code=None, percent_bp=0) for genre_id in range(1, 4)]
+    return rules
+
+def make_carts(carts: int, items: int, books: int, genres: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        ([(book_id, book_id % genres + 1, 100 + book_id % 900, rng.randint(1, 5)) for book_id in rng.sample(range(1, books + 1), items)],
+         "SPRING" if rng.random() < 0.3 else None)
+        for _ in range(carts)
+    ]
+
+def loop_quote(rules, carts):
+    book_discounts = {}
+    genre_discounts = {}
+    global_discount = 0
+    code_genres = {}
+    genre_taxes = {}
+    default_tax = 0
+    for rule in rules:
+        if rule.kind == TAX:
+            if rule.genre_id is None:
+                default_tax = max(default_tax, rule.percent_bp)
+            else:
+                genre_taxes[rule.genre_id] = max(genre_taxes.get(rule.genre_id, 0), rule.percent_bp)
+        elif rule.code:
+            code_genres.setdefault(rule.code, {})[rule.genre_id] = rule.percent_bp
+        elif rule.book_id is not None:
+            book_discounts[rule.book_id] = max(book_discounts.get(rule.book_id, 0), rule.percent_bp)
+        elif rule.genre_id is not None:
+            genre_discounts[rule.genre_id] = max(genre_discounts.get(rule.genre_id, 0), rule.percent_bp)
+        else:
+            global_discount = max(global_discount, rule.percent_bp)
+
+    quotes = []
+    for lines, promo_code in carts:
+        quote = {"lines": [], "subtotal": 0, "discount": 0, "tax": 0, "total": 0}
+        for book_id, genre_id, unit_price, quantity in lines:
+            rate = max(book_discounts.get(book_id, 0), genre_discounts.get(genre_id, 0), global_discount)
+            if promo_code:
+                rate = max(rate, code_genres.get(promo_code, {}).get(genre_id, 0))
+            subtotal = unit_price * quantity
+            discount = subtotal * rate // BASIS_POINTS
+            tax = ((subtotal - discount) * genre_taxes.get(genre_id, default_tax) + BASIS_POINTS // 2) // BASIS_POINTS
+            line = {"book_id": book_id, "quantity": quantity, "unit_price": unit_price,
+                    "subtotal": subtotal, "discount": discount, "tax": tax, "total": subtotal - discount + tax}
+            quote["lines"].append(line)
+            for field in ("subtotal", "discount", "tax", "total"):
+                quote[field] += line[field]
+        quotes.append(quote)
+    return quotes
+
+def best_of(repeat: int, function, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized pricing engine against a per-line Python loop")
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--genres", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    raw_rules = make_rules(args.books, args.genres, args.seed)
+    rules = PriceRules.build(0, raw_rules)
+    scenarios = [
+        ("1 cart x 1000 items", make_carts(1, 1000, args.books, args.genres, args.seed)),
+        ("1000 carts x 20 items", make_carts(1000, 20, args.books, args.genres, args.seed)),
+        ("100 carts x 1000 items", make_carts(100, 1000, args.books, args.genres, args.seed)),
+    ]
+
+    print(f"{'scenario':<24}{'engine':>12}{'python loop':>14}{'lines/s (engine)':>20}")
+    for name, carts in scenarios:
+        engine_time, quotes = best_of(args.repeat, quote_carts, rules, carts)
+        loop_time, expected = best_of(args.repeat, loop_quote, raw_rules, carts)
+        assert quotes == expected, "engine and reference quotes differ"
+        lines = sum(len(lines) for lines, _ in carts)
+        print(f"{name:<24}{engine_time * 1000:>10.2f}ms{loop_time * 1000:>12.2f}ms{lines / engine_time:>20,.0f}")
+
+if __name__ == "__main__":
+    main()
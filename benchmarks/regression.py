@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.datagen import ADMIN_ID, DEFAULT_SEED, Volumes, seeded_database
+
+DEEP_PAGE_LIMIT = 50
+
+TEST_ENVIRONMENT = {
+    "RATE_LIMIT_MAX_REQUESTS": str(10 ** 9),
+    "MAINTENANCE_ENABLED": "false",
+    "MAIL_SUPPRESS_SEND": "true",
+    "MAIL_USERNAME": "perf",
+    "MAIL_PASSWORD": "perf",
+    "MAIL_FROM": "perf@example.com",
+    "MAIL_PORT": "587",
+    "MAIL_SERVER": "localhost",
+    "MAIL_FROM_NAME": "Fern & Folio",
+    "SECRET_KEY": "perf-secret",
+    "URL_LINK": "http://localhost:8000"
+}
+
+@contextmanager
+def app_client(database_url: str):
+    os.environ.update({**TEST_ENVIRONMENT, "DATABASE_URL": database_url})
+    from config import get_settings
+    from database import dispose_engine
+
+    get_settings.cache_clear()
+    dispose_engine()
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+def bearer(user_id: int, role: str):
+    from routers.authtoken import create_access_token
+
+    return {"Authorization": "Bearer " + create_access_token({"user_id": user_id, "role": role})}
+
+def scenarios():
+    import models
+    from sqlalchemy import func
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        customer_id = db.query(models.Order.user_id).filter(models.Order.user_id != ADMIN_ID) \
+            .group_by(models.Order.user_id).order_by(func.count().desc()).limit(1).scalar()
+        stocked = [book_id for book_id, in db.query(models.Book.id).filter(models.Book.instock.is_(True), models.Book.quantity >= 40)
+                   .order_by(models.Book.id).limit(2)]
+        genre_id = db.query(models.Book.genre_id).filter(models.Book.id == stocked[0]).scalar()
+        deep_skip = max(db.query(func.count(models.Book.id)).scalar() // 2 - DEEP_PAGE_LIMIT, 0)
+    finally:
+        db.close()
+
+    admin = bearer(ADMIN_ID, "Admin")
+    customer = bearer(customer_id, "Customer")
+    order = {"items": [{"book_id": book_id, "quantity": 1} for book_id in stocked]}
+    return [
+        ("all_books default listing", "GET", "/book/get/allbooks", {}, None),
+        ("all_books genre and price, by price", "GET", "/book/get/allbooks",
+         {"params": {"genre_id": genre_id, "min_price": 500, "max_price": 2500, "sort_by": "price", "sort_order": "desc"}}, None),
+        ("all_books deep page", "GET", "/book/get/allbooks", {"params": {"skip": deep_skip, "limit": DEEP_PAGE_LIMIT}}, None),
+        ("all_books search", "GET", "/book/get/allbooks", {"params": {"search": "Garden"}}, None),
+        ("book facets", "GET", "/book/get/facets", {}, None),
+        ("create_order", "POST", "/order/create", {"headers": customer}, order),
+        ("getmyorders", "GET", "/order/getmyorders", {"headers": customer}, None),
+        ("getallorders", "GET", "/order/getallorders", {"headers": admin}, None),
+        ("user listing", "GET", "/user/all", {"headers": admin}, None)
+    ]
+
+def measure(client, method: str, path: str, options: dict, body, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.request(method, path, json=body, **options)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, f"{method} {path} returned {response.status_code}: {response.text[:200]}"
+    return statistics.median(timings) * 1000, min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the hot endpoints against generated data and compare with a saved baseline")
+    parser.add_argument("--database", default=None, help="SQLite file to generate into, or to reuse if it already holds data")
+    parser.add_argument("--scale", type=float, default=0.1, help="Multiplier for the default generated volumes")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--baseline", default=None, help="JSON file of median timings to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's medians to --baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Fail when a median exceeds the baseline by this factor")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline and not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+
+    results = {}
+    regressions = []
+    with seeded_database(args.database, Volumes().scaled(args.scale), args.seed) as database_url:
+        with app_client(database_url) as client:
+            print(f"{'scenario':<40}{'median':>11}{'best':>11}{'baseline':>11}")
+            for name, method, path, options, body in scenarios():
+                client.request(method, path, json=body, **options)
+                median, best = measure(client, method, path, options, body, args.repeat)
+                results[name] = round(median, 3)
+                expected = baseline.get(name)
+                flag = ""
+                if expected is not None and median > expected * args.tolerance:
+                    regressions.append(name)
+                    flag = "  REGRESSED"
+                expected_label = f"{expected:.2f}ms" if expected is not None else "-"
+                print(f"{name:<40}{median:>9.2f}ms{best:>9.2f}ms{expected_label:>11}{flag}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as handle:
+            json.dump(results, handle, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} scenario(s) slower than {args.tolerance}x baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import(env):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def measure_first_request(env, path: str, timeout: float):
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    response.read()
+                return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer {path} within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def summary(label: str, samples):
+    samples_ms = [sample * 1000 for sample in samples]
+    print(f"{label:<30} median {statistics.median(samples_ms):8.1f} ms   min {min(samples_ms):8.1f} ms   max {max(samples_ms):8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start: import time of main and time to first request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/book/get/facets")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--database-url", default=None, help="Defaults to a throwaway SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+        env["MAINTENANCE_ENABLED"] = "false"
+        subprocess.run([sys.executable, "manage.py", "create-schema"], cwd=ROOT, env=env, check=True, capture_output=True)
+
+        imports = [measure_import(env) for _ in range(args.runs)]
+        first_requests = [measure_first_request(env, args.path, args.timeout) for _ in range(args.runs)]
+
+    print(f"Cold start over {args.runs} runs")
+    summary("import main", imports)
+    summary(f"first GET {args.path}", first_requests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_until_ready(port: int, path: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", path)
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+def _client(args):
+    port, path, duration = args
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    completed = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                completed += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    return completed, errors
+
+def seed(env, books: int):
+    subprocess.run([sys.executable, "manage.py", "create-schema"], cwd=ROOT, env=env, check=True, capture_output=True)
+    seed_script = (
+        "import models\n"
+        "from database import SessionLocal\n"
+        "db = SessionLocal()\n"
+        "db.add_all([models.Genre(name=f'Genre {i}') for i in range(1, 11)])\n"
+        f"db.add_all([models.Book(title=f'Book {{i}}', author=f'Author {{i % 97}}', genre_id=i % 10 + 1, price=100 + i % 900, instock=True, quantity=i % 50) for i in range({books})])\n"
+        "db.commit()\n"
+    )
+    subprocess.run([sys.executable, "-c", seed_script], cwd=ROOT, env=env, check=True)
+
+def run_load(env, workers: int, clients: int, duration: float, path: str):
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, "-m", "server", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_ready(port, path, timeout=30)
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(_client, [(port, path, duration)] * clients)
+    finally:
+        server.terminate()
+        server.wait()
+    completed = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    return completed / duration, errors
+
+def main():
+    from server import default_workers
+
+    parser = argparse.ArgumentParser(description="Compare API throughput with one worker and with N workers")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="N, defaults to the CPU count")
+    parser.add_argument("--clients", type=int, default=None, help="Concurrent keep-alive clients, defaults to 4 per worker")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--path", default="/book/get/allbooks?genre_id=3&sort_by=price&limit=20")
+    args = parser.parse_args()
+    clients = args.clients or 4 * max(args.workers, 1)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'workers.db')}"
+        env["MAINTENANCE_ENABLED"] = "false"
+        env["RATE_LIMIT_MAX_REQUESTS"] = str(10 ** 9)
+        seed(env, args.books)
+
+        results = {}
+        for workers in sorted({1, args.workers}):
+            results[workers] = run_load(env, workers, clients, args.duration, args.path)
+
+    print(f"GET {args.path} with {clients} clients for {args.duration:.0f}s")
+    baseline = results[1][0]
+    for workers, (throughput, errors) in results.items():
+        print(f"{workers:>3} worker(s): {throughput:10.1f} req/s   errors {errors:6d}   speedup x{throughput / baseline:.2f}")
+
+if __name__ == "__main__":
+    main()
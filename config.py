@@ -1,31 +1,90 @@
+from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings
-from fastapi_mail import ConnectionConfig
 from pydantic import SecretStr
 
 class Settings(BaseSettings):
-    MAIL_USERNAME: str
-    MAIL_PASSWORD: str
-    MAIL_FROM: str
-    MAIL_PORT: int
-    MAIL_SERVER: str
-    MAIL_FROM_NAME: str
-    SECRET_KEY: str
+    DATABASE_URL: Optional[str] = None
+    URL_LINK: Optional[str] = None
+    MAIL_USERNAME: Optional[str] = None
+    MAIL_PASSWORD: Optional[str] = None
+    MAIL_FROM: Optional[str] = None
+    MAIL_PORT: Optional[int] = None
+    MAIL_SERVER: Optional[str] = None
+    MAIL_FROM_NAME: Optional[str] = None
+    MAIL_SUPPRESS_SEND: bool = False
+    SECRET_KEY: Optional[str] = None
+    FACET_PRICE_BUCKET_SIZE: int = 500
+    CATALOGUE_CHECK_SECONDS: int = 5
+    CATALOGUE_SETTLE_SECONDS: int = 60
+    LISTING_CACHE_SECONDS: int = 60
+    LISTING_CACHE_ENTRIES: int = 1024
+    COMPRESSION_MIN_BYTES: int = 500
+    GENRE_REGISTRY_CHECK_SECONDS: int = 5
+    MAINTENANCE_ENABLED: bool = True
+    MAINTENANCE_INTERVAL_SECONDS: int = 300
+    MAINTENANCE_BATCH_SIZE: int = 500
+    CART_STALE_DAYS: int = 30
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_WAIT_SECONDS: int = 10
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    RECOMMENDATIONS_TOP_K: int = 10
+    RECOMMENDATIONS_SETTLE_SECONDS: int = 60
+    PRICE_RULES_CHECK_SECONDS: int = 5
+    RATE_LIMIT_MAX_REQUESTS: int = 10
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    LOGIN_ACCOUNT_MAX_FAILURES: int = 5
+    LOGIN_IP_MAX_FAILURES: int = 20
+    LOGIN_BACKOFF_BASE_SECONDS: float = 1
+    LOGIN_BACKOFF_MAX_SECONDS: float = 900
+    LOGIN_FAILURE_RESET_SECONDS: float = 900
+    LOGIN_THROTTLE_SLOTS: int = 65536
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    SESSION_CACHE_SIZE: int = 10000
+    SESSION_REVOCATION_CHECK_SECONDS: int = 5
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: Optional[int] = None
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_BACKLOG: int = 2048
+    SERVER_TIMEOUT_SECONDS: int = 60
 
     class Config:
         env_file = ".env"
         extra = "ignore"
 
-settings = Settings()
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
+MAIL_FIELDS = ("MAIL_USERNAME", "MAIL_PASSWORD", "MAIL_FROM", "MAIL_PORT", "MAIL_SERVER", "MAIL_FROM_NAME")
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+@lru_cache
+def get_mail_config():
+    from fastapi_mail import ConnectionConfig
+
+    settings = get_settings()
+    missing = [field for field in MAIL_FIELDS if getattr(settings, field) is None]
+    if missing:
+        raise RuntimeError(f"Mail is not configured, missing: {', '.join(missing)}")
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.MAIL_USERNAME,
+        MAIL_PASSWORD=settings.MAIL_PASSWORD,
+        MAIL_FROM=settings.MAIL_FROM,
+        MAIL_PORT=settings.MAIL_PORT,
+        MAIL_SERVER=settings.MAIL_SERVER,
+        MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
+        MAIL_STARTTLS=True,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        SUPPRESS_SEND=settings.MAIL_SUPPRESS_SEND
+    )
+
+def __getattr__(name):
+    if name == "settings":
+        return get_settings()
+    if name == "conf":
+        return get_mail_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
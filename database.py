@@ -1,13 +1,28 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
-import os
+from functools import lru_cache
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.schema import CreateColumn
+from config import get_settings
 
-load_dotenv()  
-DATABASE_URL = os.getenv("DATABASE_URL")
+@lru_cache
+def get_engine():
+    database_url = get_settings().DATABASE_URL
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is not set")
+    return create_engine(database_url)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def dispose_engine():
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+        get_engine.cache_clear()
+
+class LazySession(Session):
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(*args, **kwargs)
+
+SessionLocal = sessionmaker(class_=LazySession, autocommit=False, autoflush=False)
 Base = declarative_base()
 
 def get_db():
@@ -16,3 +31,34 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def add_missing_columns(engine, metadata):
+    existing = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            columns = {column["name"] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                    added.append(f"{table.name}.{column.name}")
+            indexes = {index["name"] for index in existing.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(bind=conn)
+                    added.append(f"index {index.name}")
+    return added
+
+def create_schema():
+    import models
+
+    engine = get_engine()
+    models.Base.metadata.create_all(bind=engine)
+    return add_missing_columns(engine, models.Base.metadata)
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, status, Depends
-from routers import book, user, cart, order, genre
-from middleware import RateLimiterMiddleware
-from database import engine
-import models
+from routers import book, user, cart, order, genre, analytics, maintenance, pricing
+from middleware import CompressionMiddleware, RateLimiterMiddleware
+from database import dispose_engine
+from config import get_settings
+from utils.maintenance import scheduler
 
-app = FastAPI(title="Fern & Folio",
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if get_settings().MAINTENANCE_ENABLED:
+        scheduler.start()
+    yield
+    scheduler.stop()
+    dispose_engine()
+
+app = FastAPI(title="Fern & Folio", lifespan=lifespan,
                   description="""
     Welcome to the Fern & Folio!. A Book store API built using FastAPI, MySQL, etc.
 
@@ -19,12 +29,14 @@ app = FastAPI(title="Fern & Folio",
     - Containerized using Docker and Docker-Compose
     """)
 
-models.Base.metadata.create_all(bind=engine)
-
-app.add_middleware(RateLimiterMiddleware, max_requests=10, window_seconds=60)
+app.add_middleware(CompressionMiddleware, minimum_size=get_settings().COMPRESSION_MIN_BYTES)
+app.add_middleware(RateLimiterMiddleware, max_requests=get_settings().RATE_LIMIT_MAX_REQUESTS, window_seconds=get_settings().RATE_LIMIT_WINDOW_SECONDS)
 app.include_router(book.router)
 app.include_router(user.router)
 app.include_router(cart.router)
 app.include_router(order.router)
 app.include_router(genre.router)
+app.include_router(analytics.router)
+app.include_router(maintenance.router)
+app.include_router(pricing.router)
 
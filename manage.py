@@ -0,0 +1,23 @@
+import argparse
+from database import create_schema, get_engine
+from utils.datagen import DEFAULT_SEED, Volumes, generate
+
+def main():
+    parser = argparse.ArgumentParser(description="Fern & Folio management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create-schema", help="Create any missing database tables")
+    seed_data = commands.add_parser("seed-data", help="Fill the database with reproducible generated books, users, carts and orders")
+    seed_data.add_argument("--scale", type=float, default=1.0, help="Multiplier for the default volumes")
+    seed_data.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    seed_data.add_argument("--reset", action="store_true", help="Drop and recreate every table first")
+    args = parser.parse_args()
+
+    if args.command == "create-schema":
+        for column in create_schema():
+            print(f"Added {column}")
+        print("Database schema is up to date")
+    elif args.command == "seed-data":
+        generate(get_engine(), Volumes().scaled(args.scale), args.seed, reset=args.reset)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,44 @@
+import mmap
+import multiprocessing
 import time
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
+from utils.compression import is_compressible, negotiate, open_stream
+
+class SharedWindowCounter:
+    SLOT_FIELDS = 3
+
+    def __init__(self, slots: int = 65536):
+        self.slots = slots
+        self._buffer = mmap.mmap(-1, slots * self.SLOT_FIELDS * 8)
+        self._counters = memoryview(self._buffer).cast("q")
+        self._lock = multiprocessing.Lock()
+
+    def allow(self, key: str, max_requests: int, window_seconds: int, now: float) -> bool:
+        slot = (zlib.crc32(key.encode()) % self.slots) * self.SLOT_FIELDS
+        window = int(now // window_seconds)
+        elapsed = (now % window_seconds) / window_seconds
+        counters = self._counters
+        with self._lock:
+            if counters[slot] != window:
+                previous = counters[slot + 1] if counters[slot] == window - 1 else 0
+                counters[slot] = window
+                counters[slot + 1] = 0
+                counters[slot + 2] = previous
+            if counters[slot + 2] * (1 - elapsed) + counters[slot + 1] >= max_requests:
+                return False
+            counters[slot + 1] += 1
+            return True
+
+shared_counter = None
+
+def enable_shared_rate_limit(slots: int = 65536):
+    global shared_counter
+    shared_counter = SharedWindowCounter(slots)
+    return shared_counter
 
 class RateLimiterMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, max_requests: int = 10, window_seconds: int = 60):
@@ -9,15 +46,92 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self.client = {}
+        self.shared_counter = shared_counter
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        now = time.time()
+    def _allow(self, client_ip: str, now: float) -> bool:
+        if self.shared_counter is not None:
+            return self.shared_counter.allow(client_ip, self.max_requests, self.window_seconds, now)
         request_times = self.client.get(client_ip, [])
         request_times = [t for t in request_times if now - t < self.window_seconds]
         if len(request_times) >= self.max_requests:
-            return JSONResponse(status_code=429, content={"message": "Too many requests, try again later."})
+            return False
         request_times.append(now)
         self.client[client_ip] = request_times
+        return True
+
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.client.host
+        now = time.time()
+        if not self._allow(client_ip, now):
+            return JSONResponse(status_code=429, content={"message": "Too many requests, try again later."})
         response = await call_next(request)
         return response
+
+class _CompressingSend:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.stream = None
+        self.passthrough = False
+
+    def _should_compress(self, headers, body: bytes, more_body: bool) -> bool:
+        if self.start["status"] < 200 or self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            if not self._should_compress(headers, body, more_body):
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.stream = open_stream(self.encoding)
+            data = self.stream.compress(body)
+            if more_body:
+                del headers["content-length"]
+            else:
+                data += self.stream.flush()
+                headers["content-length"] = str(len(data))
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["etag"] = f'{etag[:-1]}-{self.encoding}"'
+            await self.send(self.start)
+        else:
+            data = self.stream.compress(body)
+            if not more_body:
+                data += self.stream.flush()
+
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Date, UniqueConstraint, Text, Index, literal_column
 from datetime import datetime
 from sqlalchemy.orm import relationship
 
@@ -13,6 +13,8 @@ class Book(Base):
     price = Column(Integer, nullable=False)
     instock = Column(Boolean, nullable=False)
     quantity = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
+    updated_at = Column(DateTime, nullable=True, index=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     genre = relationship('Genre', back_populates='books')
     order_items = relationship('OrderItem', back_populates='book')
@@ -50,6 +52,7 @@ class Order(Base):
     status = Column(String(255), nullable=False)
     created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
 
     user = relationship('User', back_populates='orders')
     items = relationship('OrderItem', back_populates='order', cascade="all, delete-orphan")
@@ -62,6 +65,7 @@ class OrderItem(Base):
     book_id = Column(Integer, ForeignKey('book.id'))
     quantity = Column(Integer, nullable=False)
     price = Column(Integer, nullable=False)
+    amount = Column(Integer, nullable=True)
 
     order = relationship('Order', back_populates='items')
     book = relationship('Book', back_populates='order_items')
@@ -112,3 +116,94 @@ class PendingRegistration(Base):
     role = Column(String(255), nullable=False)
     token_hash = Column(String(255), unique=True, nullable=False)
     expires_at = Column(DateTime, nullable=False)
+
+class CacheVersion(Base):
+    __tablename__ = "cache_version"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class SalesRollup(Base):
+    __tablename__ = "sales_rollup"
+    __table_args__ = (UniqueConstraint("day", "dimension", "key_id", name="uq_sales_rollup"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False, index=True)
+    dimension = Column(String(16), nullable=False)
+    key_id = Column(Integer, nullable=False)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+class OrderEvent(Base):
+    __tablename__ = "order_event"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), index=True, nullable=False)
+    from_status = Column(String(255), nullable=True)
+    to_status = Column(String(255), nullable=False)
+    actor_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_lease"
+
+    name = Column(String(64), primary_key=True)
+    owner = Column(String(255), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+    __table_args__ = (UniqueConstraint("user_id", "scope", "key", name="uq_idempotency_key"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    scope = Column(String(64), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    reserved_at = Column(DateTime, nullable=True)
+
+class BookCopurchase(Base):
+    __tablename__ = "book_copurchase"
+    __table_args__ = (UniqueConstraint("book_id", "related_id", name="uq_book_copurchase"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    book_id = Column(Integer, nullable=False, index=True)
+    related_id = Column(Integer, nullable=False)
+    co_purchases = Column(Integer, nullable=False, default=0)
+
+class BookRelated(Base):
+    __tablename__ = "book_related"
+    __table_args__ = (Index("ix_book_related_book_position", "book_id", "position"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    book_id = Column(Integer, nullable=False)
+    related_id = Column(Integer, nullable=False)
+    score = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+
+class PriceRule(Base):
+    __tablename__ = "price_rule"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    kind = Column(String(16), nullable=False)
+    book_id = Column(Integer, ForeignKey('book.id'), nullable=True)
+    genre_id = Column(Integer, ForeignKey('genre.id'), nullable=True)
+    code = Column(String(64), nullable=True)
+    percent_bp = Column(Integer, nullable=False)
+    active = Column(Boolean, default=True, nullable=False)
+
+class UserSession(Base):
+    __tablename__ = "user_session"
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    role = Column(String(255), nullable=False)
+    refresh_hash = Column(String(64), nullable=False)
+    previous_hash = Column(String(64), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from datetime import date, datetime, timedelta
+from routers.rbac import require_role
+from database import get_db
+from utils import analytics
+from sqlalchemy.orm import Session
+
+router = APIRouter(
+    prefix="/analytics",   
+    tags=["Analytics"]
+    )
+
+def _date_range(start: date = None, end: date = None):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=30)
+    return start, end
+
+@router.get('/sales/daily')
+def daily_sales(start: date = None, end: date = None, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    start, end = _date_range(start, end)
+    return {"start": start, "end": end, "days": analytics.daily_totals(db, start, end)}
+
+@router.get('/sales/books')
+def top_books(start: date = None, end: date = None, limit: int = 10, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    start, end = _date_range(start, end)
+    return {"start": start, "end": end, "books": analytics.top(db, "book", start, end, limit)}
+
+@router.get('/sales/genres')
+def top_genres(start: date = None, end: date = None, limit: int = 10, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    start, end = _date_range(start, end)
+    return {"start": start, "end": end, "genres": analytics.top(db, "genre", start, end, limit)}
+
+@router.get('/sales/users')
+def top_users(start: date = None, end: date = None, limit: int = 10, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    start, end = _date_range(start, end)
+    return {"start": start, "end": end, "users": analytics.top(db, "user", start, end, limit)}
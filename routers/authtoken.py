@@ -1,11 +1,6 @@
 from datetime import datetime, timedelta
 from fastapi import status, HTTPException
 from jose import JWTError, jwt
-from dotenv import load_dotenv
-import os
-
-load_dotenv()  
-your_secret_key = os.getenv("your_secret_key")
 
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
@@ -24,6 +19,6 @@ def verify_access_token(token: str):
         role: str = payload.get("role")
         if user_id is None or role is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        return {"user_id": user_id, "role": role}
+        return {"user_id": user_id, "role": role, "session_id": payload.get("sid")}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
\ No newline at end of file
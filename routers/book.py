@@ -1,12 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
-import csv, requests, random
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Request, Response
+import csv, requests
 from schemas import Book, BookOut
 from typing import List
 import models
 from routers.rbac import get_current_user, require_role
 from fastapi.security import OAuth2PasswordRequestForm
 from database import get_db
-from sqlalchemy import or_
+from utils.catalogue import SORT_COLUMNS, catalogue
+from utils.compression import listing_cache
+from utils.facets import catalogue_facets
+from utils.genre_registry import genre_registry
+from utils.http_cache import conditional, entity_tag, public
+from utils.recommendations import related_books
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
 router = APIRouter(
@@ -14,18 +20,7 @@ router = APIRouter(
     tags=["Books"]
     )
 
-@router.get('/get/allbooks', response_model=List[BookOut])
-def all_books(db: Session = Depends(get_db), 
-            search: str = None,
-            genre_id: int = None,
-            min_price: int = None,
-            max_price: int = None,
-            is_available: bool = True,
-            sort_by: str = "title",
-            sort_order: str = "asc",
-            skip: int = 0,
-            limit: int = 10
-            ):
+def _query_books(db, search, genre_id, min_price, max_price, is_available, sort_by, sort_order, skip, limit):
     query = db.query(models.Book)
 
     if search:
@@ -42,6 +37,9 @@ def all_books(db: Session = Depends(get_db),
         query = query.filter(models.Book.price >= min_price)
     if max_price:
         query = query.filter(models.Book.price <= max_price)
+    if is_available is not None:
+        available = and_(models.Book.instock.is_(True), models.Book.quantity > 0)
+        query = query.filter(available if is_available else ~available)
 
     sort_column = getattr(models.Book, sort_by, models.Book.title)
     if sort_order == "desc":
@@ -50,11 +48,51 @@ def all_books(db: Session = Depends(get_db),
 
     query = query.offset(skip).limit(limit)
 
-    books = query.all()
+    return query.all()
 
-    if not books:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No books available")
-    return books
+@router.get('/get/allbooks', response_model=List[BookOut])
+def all_books(request: Request, response: Response, db: Session = Depends(get_db), 
+            search: str = None,
+            genre_id: int = None,
+            min_price: int = None,
+            max_price: int = None,
+            is_available: bool = True,
+            sort_by: str = "title",
+            sort_order: str = "asc",
+            skip: int = 0,
+            limit: int = 10
+            ):
+    if search or (sort_by not in SORT_COLUMNS and hasattr(models.Book, sort_by)):
+        books = _query_books(db, search, genre_id, min_price, max_price, is_available, sort_by, sort_order, skip, limit)
+        if not books:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No books available")
+        response.headers["Cache-Control"] = public()
+        return books
+
+    sort_by = sort_by if sort_by in SORT_COLUMNS else "title"
+    columns = catalogue.snapshot(db)
+
+    def render():
+        books = catalogue.browse(columns, genre_id=genre_id, min_price=min_price, max_price=max_price, is_available=is_available,
+                                 sort_by=sort_by, sort_order=sort_order, skip=skip, limit=limit)
+        if not books:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No books available")
+        return books
+
+    key = (genre_id, min_price, max_price, is_available, sort_by, sort_order, skip, limit)
+    return listing_cache.response(request, key, columns.generation, render, headers={"Cache-Control": public()})
+
+@router.get('/get/facets')
+def book_facets(response: Response, db: Session = Depends(get_db),
+            search: str = None,
+            genre_id: int = None,
+            min_price: int = None,
+            max_price: int = None,
+            is_available: bool = None
+            ):
+    response.headers["Cache-Control"] = public()
+    return catalogue_facets.counts(db, search=search, genre_id=genre_id, min_price=min_price,
+                                   max_price=max_price, is_available=is_available)
 
 @router.post('/create')
 def create_book(request: Book, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
@@ -72,6 +110,7 @@ def create_book_csv(db: Session = Depends(get_db), current_user: dict = Depends(
     
     content = file.file.read().decode("utf-8").splitlines()
     reader = csv.DictReader(content)
+    genres = genre_registry.snapshot(db)
 
     added_books = []
     for row in reader:
@@ -80,9 +119,11 @@ def create_book_csv(db: Session = Depends(get_db), current_user: dict = Depends(
         try:
             price = int(row.get("price", 0))
             quantity = int(row.get("stock", 0))
-            genre_id = int(row.get("genre_id", 1))
+            genre_id = genres.id_for(row["genre"]) if row.get("genre") else int(row.get("genre_id", 1))
         except ValueError:
             continue  
+        if genre_id not in genres.by_id:
+            continue
 
         book = models.Book(
             title=row["title"],
@@ -104,14 +145,6 @@ def create_book_csv(db: Session = Depends(get_db), current_user: dict = Depends(
 
 @router.post('/create/isbn/{isbn}')
 def create_books_isbn(isbn: str, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin", "Staff"))):
-    CATEGORY_TO_GENRE_ID = {
-        "History": 2,
-        "Philosophy": 3,
-        "Literature": 4,
-        "Science": 5,
-        "Fiction": 6
-    }
-
     url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
     response = requests.get(url)
     
@@ -128,11 +161,12 @@ def create_books_isbn(isbn: str, db: Session = Depends(get_db), current_user: di
     authors = ", ".join(book_info.get("authors", ["Unknown Author"]))
     categories = book_info.get("categories", [])
 
-    if categories:
-        genre_name = categories[0]
-        genre_id = CATEGORY_TO_GENRE_ID.get(genre_name, random.choice([4, 5]))
-    else:
-        genre_id = 1
+    genres = genre_registry.snapshot(db)
+    genre_id = 1
+    for genre_name in categories:
+        if genres.id_for(genre_name) is not None:
+            genre_id = genres.id_for(genre_name)
+            break
 
     price = 0.0
     stock = 10
@@ -165,12 +199,21 @@ def create_books_isbn(isbn: str, db: Session = Depends(get_db), current_user: di
     }
 
 @router.get('/get/{id}')
-def get_book(id: int, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+def get_book(id: int, request: Request, response: Response, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
     book_with_id = db.query(models.Book).filter(models.Book.id == id).first()
     if not book_with_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"book with id {id} not found")
+    not_modified = conditional(request, response, entity_tag("book", book_with_id.id, book_with_id.version), book_with_id.updated_at)
+    if not_modified:
+        return not_modified
     return book_with_id
 
+@router.get('/{id}/related')
+def get_related_books(id: int, response: Response, limit: int = 10, db: Session = Depends(get_db)):
+    related = related_books(db, id, limit)
+    response.headers["Cache-Control"] = public()
+    return {"book_id": id, "related": [{"id": book_id, "title": title, "score": score} for book_id, title, score in related]}
+
 @router.delete('/delete/{id}')
 def delete_book(id: int, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
     books = db.query(models.Book).filter(models.Book.id == id).first()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Header
 from schemas import addtocart, CartitemUpdate
 import models
 from datetime import datetime
@@ -7,6 +7,9 @@ from fastapi.security import OAuth2PasswordRequestForm
 from routers.authtoken import create_access_token
 from hashing import hash_password, verify_password
 from database import get_db
+from utils.idempotency import idempotency_store
+from utils.pricing import price_rules, quote_books
+from typing import Optional
 from sqlalchemy.orm import Session
 
 router = APIRouter(
@@ -15,28 +18,30 @@ router = APIRouter(
     )
 
 @router.post('/add')
-def add_to_cart(request: addtocart, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def add_to_cart(request: addtocart, idempotency_key: Optional[str] = Header(None), current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    return idempotency_store.run(idempotency_key, current_user["user_id"], "cart.add", request, db,
+                                 lambda: _add_to_cart(request, current_user, db))
+
+def _add_to_cart(request: addtocart, current_user: dict, db: Session):
     book = db.query(models.Book).filter(models.Book.id == request.book_id).first()
     if not book or book.quantity < request.quantity:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not available")
     
-    cart = db.query(models.Cart).filter(models.Cart.id == current_user["user_id"]).first()
+    cart = db.query(models.Cart).filter(models.Cart.user_id == current_user["user_id"]).first()
     if not cart:
         cart = models.Cart(user_id=current_user["user_id"], status="Active", created_at=datetime.utcnow(), updated_at=datetime.utcnow())
         db.add(cart)
-        db.commit()
-        db.refresh(cart)
+        db.flush()
 
+    cart.updated_at = datetime.utcnow()
     cart_item = db.query(models.CartItem).filter(models.CartItem.cart_id == cart.id, models.CartItem.book_id == book.id).first()
     if cart_item:
         cart_item.quantity += request.quantity
-        cart_item.price += cart_item.quantity * book.price
+        cart_item.price = cart_item.quantity * book.price
     else:
         cart_item = models.CartItem(cart_id=cart.id, book_id=book.id, quantity=request.quantity, price=book.price * request.quantity)
         db.add(cart_item)
-
-    db.commit()
-    db.refresh(cart_item)
+    db.flush()
 
     return {
         "cart_id": cart.id,
@@ -48,11 +53,18 @@ def add_to_cart(request: addtocart, current_user: dict = Depends(get_current_use
     }
         
 @router.get('/get/{id}')
-def get_cart(id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+def get_cart(id: int, promo_code: Optional[str] = None, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     cart = db.query(models.Cart).filter(models.Cart.id == id).first()
     if not cart:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cart with id {id} not found")
-    return cart
+
+    items = db.query(models.CartItem, models.Book).join(models.Book, models.Book.id == models.CartItem.book_id) \
+        .filter(models.CartItem.cart_id == cart.id).all()
+    quote = quote_books(price_rules.snapshot(db), [(book, cart_item.quantity) for cart_item, book in items], promo_code)
+    for (cart_item, book), line in zip(items, quote["lines"]):
+        line.update({"cartitem_id": cart_item.id, "title": book.title})
+
+    return {"cart_id": cart.id, "user_id": cart.user_id, "status": cart.status, **quote}
 
 @router.patch('/update/{item_id}')
 def update_cart(item_id: int, request: CartitemUpdate, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -65,6 +77,10 @@ def update_cart(item_id: int, request: CartitemUpdate, current_user: dict = Depe
     for key, value in update_data.items():  
         setattr(cart_item, key, value)
 
+    book = db.query(models.Book).filter(models.Book.id == cart_item.book_id).first()
+    if book:
+        cart_item.price = cart_item.quantity * book.price
+
     db.commit()        
     db.refresh(cart_item)
 
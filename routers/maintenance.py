@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from routers.rbac import require_role
+from utils.maintenance import scheduler
+
+router = APIRouter(
+    prefix="/maintenance",   
+    tags=["Maintenance"]
+    )
+
+@router.get('/metrics')
+def maintenance_metrics(current_user: dict = Depends(require_role("Admin"))):
+    return scheduler.snapshot()
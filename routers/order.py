@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
-from schemas import OrderCreate, OrderOut, OrderStatusUpdate
+from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks, Header, Request, Response
+from schemas import OrderCreate, OrderOut, OrderStatusUpdate, OrderBulkStatusUpdate, OrderEventOut
 import models
 from utils.send_verification import send_email_order
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from routers.rbac import get_current_user, require_role
 from fastapi_mail import MessageSchema
@@ -10,6 +10,11 @@ from fastapi.security import OAuth2PasswordRequestForm
 from routers.authtoken import create_access_token
 from hashing import hash_password, verify_password
 from database import get_db
+from utils.analytics import record_order
+from utils.order_lifecycle import PENDING, validate_status, can_transition, transition_orders, record_event
+from utils.http_cache import PRIVATE, conditional, entity_tag
+from utils.idempotency import idempotency_store
+from utils.pricing import price_rules, quote_books
 from sqlalchemy.orm import Session
 
 router = APIRouter(
@@ -18,49 +23,62 @@ router = APIRouter(
     )
 
 @router.post("/create")
-def create_order(request: OrderCreate, background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_order(request: OrderCreate, background_tasks: BackgroundTasks, idempotency_key: Optional[str] = Header(None), current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    return idempotency_store.run(idempotency_key, current_user["user_id"], "order.create", request, db,
+                                 lambda: _create_order(request, background_tasks, current_user, db))
+
+def _create_order(request: OrderCreate, background_tasks: BackgroundTasks, current_user: dict, db: Session):
     user_id = current_user["user_id"]
-    amount = 0
+    books = {book.id: book for book in db.query(models.Book).filter(models.Book.id.in_([item.book_id for item in request.items])).all()}
 
     for item in request.items:
-        book = db.query(models.Book).filter(models.Book.id == item.book_id).first()
+        book = books.get(item.book_id)
         if not book:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Book with id {item.book_id} not available")
         if book.quantity < item.quantity:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Not enough stock for book id {item.book_id}")
-        amount += item.quantity * book.price
 
-    new_order = models.Order(user_id=user_id, status="Pending", total_amount=amount, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    quote = quote_books(price_rules.snapshot(db), [(books[item.book_id], item.quantity) for item in request.items], request.promo_code)
+    amount = quote["total"]
+
+    new_order = models.Order(user_id=user_id, status=PENDING, total_amount=amount, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
+    db.flush()
+    record_event(db, new_order.id, None, PENDING, user_id)
 
     order_list = []
+    lines = []
 
-    for item in request.items:
-        order_item = models.OrderItem(order_id=new_order.id, book_id=item.book_id, quantity=item.quantity, price=book.price)
-        book = db.query(models.Book).filter(models.Book.id == item.book_id).first()
+    for item, line in zip(request.items, quote["lines"]):
+        book = books[item.book_id]
+        order_item = models.OrderItem(order_id=new_order.id, book_id=item.book_id, quantity=item.quantity, price=book.price, amount=line["total"])
         book.quantity -= item.quantity
-        order_list.append(item)
+        order_list.append({"title": book.title, "quantity": item.quantity, "total": line["total"]})
+        lines.append((book.id, book.genre_id, item.quantity, line["total"]))
         db.add(order_item)
         db.add(book)
 
+    record_order(db, new_order, lines)
+
     users_id = db.query(models.User).filter(models.User.id == user_id).first()
     customer_email = users_id.email
     customer_name = users_id.name
     order_id = new_order.id
-    background_tasks.add_task(send_email_order, customer_name, order_id, amount, customer_email, order_list)
-
-    db.commit()
-    db.refresh(new_order)
+    background_tasks.add_task(send_email_order, customer_name, order_id, amount, customer_email, order_list,
+                              quote["subtotal"], quote["discount"], quote["tax"])
+    db.flush()
 
-    return {"order_id": new_order.id, "total_amount": new_order.total_amount, "status": new_order.status}
+    return {"order_id": new_order.id, "subtotal": quote["subtotal"], "discount": quote["discount"], "tax": quote["tax"],
+            "total_amount": new_order.total_amount, "status": new_order.status}
 
 @router.get('/get/{id}')
-def get_order(id: int, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_order(id: int, request: Request, response: Response, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     order = db.query(models.Order).filter(models.Order.id == id).first()
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Order with id {id} not found")
+    not_modified = conditional(request, response, entity_tag("order", order.id, order.version), order.updated_at)
+    if not_modified:
+        return not_modified
     
     items = []
     for item in order.items:
@@ -79,17 +97,19 @@ def get_order(id: int, current_user: dict = Depends(get_current_user), db: Sessi
     }
 
 @router.get('/getmyorders')
-def get_my_orders(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_my_orders(response: Response, current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     orders = db.query(models.Order).filter(models.Order.user_id == current_user["user_id"]).all()
     if not orders:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No orders of user with id {id}")
+    response.headers["Cache-Control"] = PRIVATE
     return orders
 
 @router.get('/getallorders', response_model=List[OrderOut])
-def get_all_orders(db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+def get_all_orders(response: Response, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
     orders = db.query(models.Order).all()
     if not orders:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No orders")
+    response.headers["Cache-Control"] = PRIVATE
     return orders
 
 @router.patch('/updatestatus')
@@ -99,12 +119,34 @@ def update_status(id: int,  request: OrderStatusUpdate, db: Session = Depends(ge
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No order with id {id}")
     
     new_status = request.status
-    order.status = new_status
+    validate_status(new_status)
+    if not can_transition(order.status, new_status):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Cannot change order status from {order.status} to {new_status}")
+
+    if not transition_orders(db, [order.id], new_status, current_user["user_id"]):
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Order {id} changed status before it could be updated to {new_status}")
     db.commit()
-    db.refresh(order)
 
     return {"message": f"Order status updated to {new_status}"}
 
+@router.patch('/bulkstatus')
+def bulk_update_status(request: OrderBulkStatusUpdate, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    order_ids = set(request.order_ids)
+    updated = transition_orders(db, order_ids, request.status, current_user["user_id"])
+    db.commit()
+
+    return {
+        "message": f"{len(updated)} orders updated to {request.status}",
+        "updated": sorted(updated),
+        "skipped": sorted(order_ids - set(updated))
+    }
+
+@router.get('/events', response_model=List[OrderEventOut])
+def get_order_events(after_id: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    return db.query(models.OrderEvent).filter(models.OrderEvent.id > after_id) \
+        .order_by(models.OrderEvent.id).limit(min(limit, 1000)).all()
+
 @router.delete('/delete')
 def delete_order(id: int, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
     order = db.query(models.Order).filter(models.Order.id == id).first()
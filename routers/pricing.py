@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from schemas import PriceRuleCreate, PriceRuleResponse, QuoteRequest
+from typing import List
+import models
+from routers.rbac import get_current_user, require_role
+from database import get_db
+from utils.pricing import RULE_KINDS, BASIS_POINTS, TAX, price_rules, quote_carts
+from sqlalchemy.orm import Session
+
+router = APIRouter(
+    prefix="/pricing",   
+    tags=["Pricing"]
+    )
+
+@router.post('/rules', response_model=PriceRuleResponse)
+def create_rule(request: PriceRuleCreate, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    if request.kind not in RULE_KINDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Rule kind must be one of {', '.join(RULE_KINDS)}")
+    if not 0 <= request.percent_bp <= BASIS_POINTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"percent_bp must be between 0 and {BASIS_POINTS}")
+    if request.kind == TAX and (request.book_id is not None or request.code):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tax rules apply store-wide or per genre, book_id and code are not allowed")
+
+    rule = models.PriceRule(kind=request.kind, percent_bp=request.percent_bp, book_id=request.book_id,
+                            genre_id=request.genre_id, code=request.code, active=True)
+    db.add(rule)
+    price_rules.bump(db)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+@router.get('/rules', response_model=List[PriceRuleResponse])
+def get_rules(db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    return db.query(models.PriceRule).order_by(models.PriceRule.id).all()
+
+@router.delete('/rules/{id}')
+def delete_rule(id: int, db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin","Staff"))):
+    rule = db.query(models.PriceRule).filter(models.PriceRule.id == id).first()
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No price rule with id {id}")
+    db.delete(rule)
+    price_rules.bump(db)
+    db.commit()
+    return {"message": f"Price rule with id {id} deleted"}
+
+@router.post('/quote')
+def quote(request: QuoteRequest, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    book_ids = {item.book_id for cart in request.carts for item in cart.items}
+    books = {
+        book_id: (book_id, genre_id or 0, price)
+        for book_id, genre_id, price in db.query(models.Book.id, models.Book.genre_id, models.Book.price).filter(models.Book.id.in_(book_ids))
+    }
+    missing = sorted(book_ids - books.keys())
+    if missing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Books not found: {missing}")
+
+    carts = [([books[item.book_id] + (item.quantity,) for item in cart.items], cart.promo_code) for cart in request.carts]
+    return {"quotes": quote_carts(price_rules.snapshot(db), carts)}
@@ -1,5 +1,6 @@
 from fastapi import Depends, HTTPException, status
 from routers.authtoken import verify_access_token
+from utils.sessions import revocation_list
 from fastapi.security import OAuth2PasswordBearer
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login")
@@ -8,9 +9,12 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     payload = verify_access_token(token)
     user_id = payload.get("user_id")
     role = payload.get("role")
+    session_id = payload.get("session_id")
     if user_id is None or role is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return {"user_id": user_id, "role": role}
+    if session_id is not None and revocation_list.is_revoked(session_id):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session has been revoked")
+    return {"user_id": user_id, "role": role, "session_id": session_id}
 
 def require_role(*roles):
     def role_checker(current_user: dict = Depends(get_current_user)):
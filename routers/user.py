@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from schemas import User, LoginRequest, UserUpdate
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from schemas import User, LoginRequest, UserUpdate, RefreshRequest
 import models
 from datetime import datetime, timedelta
 from utils.send_verification import send_verification_email
@@ -8,10 +8,10 @@ from fastapi.responses import HTMLResponse
 from routers.rbac import get_current_user, require_role
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_mail import FastMail, MessageSchema, MessageType
-from config import settings, conf
-from routers.authtoken import create_access_token
 from hashing import hash_password, verify_password
 from database import get_db
+from utils.login_throttle import login_throttle
+from utils.sessions import session_store
 from sqlalchemy.orm import Session
 
 router = APIRouter(
@@ -73,15 +73,33 @@ async def verify_user(token: str, db: Session = Depends(get_db)):
     return HTMLResponse("<h2>Email verified successfully! You can now log in.</h2>")
 
 @router.post("/login")
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login_user(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    client_ip = request.client.host if request.client else ""
+    retry_after = login_throttle.retry_after(form_data.username, client_ip)
+    if retry_after:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many failed login attempts, try again later",
+                            headers={"Retry-After": str(retry_after)})
+
     user = db.query(models.User).filter(models.User.email == form_data.username).first()
     if not user:
+        login_throttle.record_failure(form_data.username, client_ip)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email not registered")
     if not verify_password(form_data.password, user.password):
+        login_throttle.record_failure(form_data.username, client_ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+    login_throttle.record_success(form_data.username)
+
+    return session_store.create(db, user)
+
+@router.post("/token/refresh")
+def refresh_token(request: RefreshRequest, db: Session = Depends(get_db)):
+    return session_store.rotate(db, request.refresh_token)
 
-    token = create_access_token({"user_id": user.id, "role": user.role})
-    return {"access_token": token, "token_type": "bearer"}
+@router.post("/logout")
+def logout_user(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user["session_id"]:
+        session_store.revoke(db, current_user["session_id"])
+    return {"message": "Logged out"}
 
 @router.get('/all')
 def get_all_user(db: Session = Depends(get_db), current_user: dict = Depends(require_role("Admin"))):
@@ -104,6 +122,8 @@ def update_user(id: int,request: UserUpdate, current_user: dict = Depends(get_cu
         setattr(new_user, key, value)
 
     db.commit()        
+    if "password" in update_data or "role" in update_data:
+        session_store.revoke_user(db, new_user.id)
     db.refresh(new_user)
 
     return new_user
@@ -122,6 +142,7 @@ def delete_user(id: int, db: Session = Depends(get_db), current_user: dict = Dep
     if not book:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No user with id {id}")
     
+    session_store.revoke_user(db, id)
     db.delete(book)
     db.commit()
 
@@ -49,6 +49,9 @@ class TokenResponse(BaseModel):
     access_token: str
     token_type: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[str] = None
@@ -121,9 +124,42 @@ class OrderItemCreate(BaseModel):
 
 class OrderCreate(BaseModel):
     items: List[OrderItemCreate]
+    promo_code: Optional[str] = None
 
 class OrderStatusUpdate(BaseModel):
     status: Optional[str] = None
 
 class GenreCreate(BaseModel):
-    name: str
\ No newline at end of file
+    name: str
+
+class PriceRuleCreate(BaseModel):
+    kind: str
+    percent_bp: int
+    book_id: Optional[int] = None
+    genre_id: Optional[int] = None
+    code: Optional[str] = None
+
+class PriceRuleResponse(PriceRuleCreate):
+    id: int
+    active: bool
+
+    class Config:
+        from_attributes = True
+
+class QuoteRequest(BaseModel):
+    carts: List[OrderCreate]
+
+class OrderBulkStatusUpdate(BaseModel):
+    order_ids: List[int]
+    status: str
+
+class OrderEventOut(BaseModel):
+    id: int
+    order_id: int
+    from_status: Optional[str] = None
+    to_status: str
+    actor_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
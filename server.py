@@ -0,0 +1,82 @@
+import argparse
+import importlib.util
+import os
+import uvicorn
+import middleware
+from utils.login_throttle import login_throttle
+from config import get_settings
+from database import dispose_engine
+
+def default_workers() -> int:
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+def _post_fork(server, worker):
+    dispose_engine()
+
+def run_gunicorn(host: str, port: int, workers: int):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    settings = get_settings()
+
+    class TunedUvicornWorker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": event_loop(), "http": http_protocol()}
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", TunedUvicornWorker)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("keepalive", settings.SERVER_KEEPALIVE_SECONDS)
+            self.cfg.set("backlog", settings.SERVER_BACKLOG)
+            self.cfg.set("timeout", settings.SERVER_TIMEOUT_SECONDS)
+            self.cfg.set("graceful_timeout", settings.SERVER_TIMEOUT_SECONDS)
+            self.cfg.set("post_fork", _post_fork)
+
+        def load(self):
+            from main import app
+            return app
+
+    middleware.enable_shared_rate_limit()
+    login_throttle.enable_shared()
+    Application().run()
+
+def run_uvicorn(host: str, port: int, workers: int):
+    settings = get_settings()
+    uvicorn.run(
+        "main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=event_loop(),
+        http=http_protocol(),
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS
+    )
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run the Fern & Folio API")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or default_workers())
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("gunicorn"):
+        run_gunicorn(args.host, args.port, args.workers)
+    else:
+        print("gunicorn is not installed, falling back to uvicorn without app preloading; rate limits will be per worker")
+        run_uvicorn(args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    main()
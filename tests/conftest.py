@@ -0,0 +1,51 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.regression import TEST_ENVIRONMENT
+from utils import datagen
+
+PERF_SCALE = float(os.environ.get("PERF_SCALE", "0.01"))
+
+def pytest_addoption(parser):
+    parser.addoption("--perf", action="store_true", help="Also check endpoint timings against their wall-clock budgets")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: wall-clock budget check, only run with --perf")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--perf"):
+        return
+    skip = pytest.mark.skip(reason="timing budget, run with --perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip)
+
+@pytest.fixture(scope="session")
+def seeded_database(tmp_path_factory):
+    path = os.environ.get("PERF_DATABASE") or str(tmp_path_factory.mktemp("data") / "fern_and_folio.db")
+    with datagen.seeded_database(path, datagen.Volumes().scaled(PERF_SCALE), log=lambda message: None) as database_url:
+        yield database_url
+
+@pytest.fixture(scope="session")
+def client(seeded_database):
+    from fastapi.testclient import TestClient
+    from config import get_settings
+    from database import dispose_engine
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for name, value in {**TEST_ENVIRONMENT, "DATABASE_URL": seeded_database}.items():
+            monkeypatch.setenv(name, value)
+        get_settings.cache_clear()
+        dispose_engine()
+        import main
+
+        try:
+            with TestClient(main.app) as client:
+                yield client
+        finally:
+            dispose_engine()
+            get_settings.cache_clear()
@@ -0,0 +1,80 @@
+import os
+import pytest
+from sqlalchemy import func
+from benchmarks.regression import DEEP_PAGE_LIMIT, measure, scenarios
+
+REPEAT = int(os.environ.get("PERF_REPEAT", "5"))
+BUDGET_FACTOR = float(os.environ.get("PERF_BUDGET_FACTOR", "1"))
+BUDGETS_MS = {
+    "all_books default listing": 50,
+    "all_books genre and price, by price": 50,
+    "all_books deep page": 50,
+    "all_books search": 100,
+    "book facets": 50,
+    "create_order": 250,
+    "getmyorders": 100,
+    "getallorders": 500,
+    "user listing": 250
+}
+
+@pytest.fixture(scope="module")
+def scenario_table(client):
+    return {name: (method, path, options, body) for name, method, path, options, body in scenarios()}
+
+@pytest.fixture
+def db(client):
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def test_every_scenario_has_a_budget(scenario_table):
+    assert set(scenario_table) == set(BUDGETS_MS)
+
+@pytest.mark.perf
+@pytest.mark.parametrize("name", list(BUDGETS_MS))
+def test_scenario_within_budget(client, scenario_table, name):
+    method, path, options, body = scenario_table[name]
+    client.request(method, path, json=body, **options)
+    median, _ = measure(client, method, path, options, body, REPEAT)
+    assert median <= BUDGETS_MS[name] * BUDGET_FACTOR, f"{name} took {median:.1f}ms, budget {BUDGETS_MS[name] * BUDGET_FACTOR:.0f}ms"
+
+def test_all_books_matches_the_database_order(client, db):
+    import models
+
+    expected = db.query(models.Book.id, models.Book.title).filter(models.Book.instock.is_(True), models.Book.quantity > 0) \
+        .order_by(models.Book.title, models.Book.id).limit(10).all()
+    response = client.get("/book/get/allbooks")
+    assert response.status_code == 200
+    assert [(book["id"], book["title"]) for book in response.json()] == [tuple(row) for row in expected]
+
+def test_all_books_deep_page_is_full(client, scenario_table):
+    method, path, options, body = scenario_table["all_books deep page"]
+    response = client.request(method, path, json=body, **options)
+    assert response.status_code == 200
+    assert options["params"]["skip"] > 0
+    assert len(response.json()) == DEEP_PAGE_LIMIT
+
+def test_facets_count_every_book(client, db):
+    import models
+
+    response = client.get("/book/get/facets")
+    assert response.status_code == 200
+    assert response.json()["total"] == db.query(func.count(models.Book.id)).scalar()
+
+def test_create_order_takes_stock(client, scenario_table, db):
+    import models
+
+    method, path, options, body = scenario_table["create_order"]
+    book_ids = [item["book_id"] for item in body["items"]]
+    before = dict(db.query(models.Book.id, models.Book.quantity).filter(models.Book.id.in_(book_ids)))
+    response = client.request(method, path, json=body, **options)
+    assert response.status_code == 200
+    db.expire_all()
+    after = dict(db.query(models.Book.id, models.Book.quantity).filter(models.Book.id.in_(book_ids)))
+    assert after == {book_id: quantity - 1 for book_id, quantity in before.items()}
+    order = db.get(models.Order, response.json()["order_id"])
+    assert order.total_amount == response.json()["total_amount"]
@@ -0,0 +1,170 @@
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+import models
+from database import SessionLocal
+from utils.upsert import increment
+
+EXCLUDED_STATUSES = {"Cancelled"}
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+def counts_towards_sales(status: str) -> bool:
+    return status not in EXCLUDED_STATUSES
+
+def _add_order(deltas, day, user_id, total_amount, lines, sign=1):
+    units = sum(quantity for _, _, quantity, _ in lines)
+    for key in (("total", 0), ("user", user_id or 0)):
+        row = deltas[(day,) + key]
+        row[0] += sign
+        row[1] += sign * units
+        row[2] += sign * total_amount
+    for book_id, genre_id, quantity, amount in lines:
+        for key in (("book", book_id or 0), ("genre", genre_id or 0)):
+            row = deltas[(day,) + key]
+            row[0] += sign
+            row[1] += sign * quantity
+            row[2] += sign * amount
+
+def _rows(deltas):
+    return [
+        {"day": day, "dimension": dimension, "key_id": key_id, "orders": values[0], "units": values[1], "revenue": values[2]}
+        for (day, dimension, key_id), values in deltas.items()
+    ]
+
+def _upsert(db, deltas):
+    increment(db, models.SalesRollup.__table__, _rows(deltas), ("day", "dimension", "key_id"), ("orders", "units", "revenue"))
+
+def _line_amount():
+    return func.coalesce(models.OrderItem.amount, models.OrderItem.quantity * models.OrderItem.price)
+
+def _order_lines(db, order_ids):
+    lines = defaultdict(list)
+    rows = db.query(models.OrderItem.order_id, models.OrderItem.book_id, models.Book.genre_id, models.OrderItem.quantity, _line_amount()) \
+        .outerjoin(models.Book, models.Book.id == models.OrderItem.book_id) \
+        .filter(models.OrderItem.order_id.in_(order_ids)).all()
+    for order_id, book_id, genre_id, quantity, amount in rows:
+        lines[order_id].append((book_id, genre_id, quantity, amount))
+    return lines
+
+def record_order(db, order, lines):
+    if not counts_towards_sales(order.status):
+        return
+    deltas = defaultdict(lambda: [0, 0, 0])
+    _add_order(deltas, _as_date(order.created_at), order.user_id, order.total_amount, lines)
+    _upsert(db, deltas)
+
+def record_status_changes(db, orders, new_status: str):
+    changed = [order for order in orders if counts_towards_sales(order.status) != counts_towards_sales(new_status)]
+    if not changed:
+        return
+    lines = _order_lines(db, [order.id for order in changed])
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for order in changed:
+        sign = -1 if counts_towards_sales(order.status) else 1
+        _add_order(deltas, _as_date(order.created_at), order.user_id, order.total_amount, lines[order.id], sign)
+    _upsert(db, deltas)
+
+def _rebuild_chunk(db, start: date, end: date):
+    start_at = datetime.combine(start, datetime.min.time())
+    end_at = datetime.combine(end, datetime.min.time())
+    day = func.date(models.Order.created_at)
+    in_range = (
+        models.Order.created_at >= start_at,
+        models.Order.created_at < end_at,
+        models.Order.status.notin_(EXCLUDED_STATUSES)
+    )
+
+    deltas = defaultdict(lambda: [0, 0, 0])
+    orders = db.query(day, models.Order.user_id, func.count(models.Order.id), func.sum(models.Order.total_amount)) \
+        .filter(*in_range).group_by(day, models.Order.user_id).all()
+    for order_day, user_id, order_count, revenue in orders:
+        for key in (("total", 0), ("user", user_id or 0)):
+            row = deltas[(_as_date(order_day),) + key]
+            row[0] += order_count
+            row[2] += revenue or 0
+
+    items = db.query(day, models.Order.user_id, models.OrderItem.book_id, models.Book.genre_id,
+                     func.count(models.OrderItem.id), func.sum(models.OrderItem.quantity), func.sum(_line_amount())) \
+        .join(models.Order, models.Order.id == models.OrderItem.order_id) \
+        .outerjoin(models.Book, models.Book.id == models.OrderItem.book_id) \
+        .filter(*in_range) \
+        .group_by(day, models.Order.user_id, models.OrderItem.book_id, models.Book.genre_id).all()
+    for order_day, user_id, book_id, genre_id, lines, units, revenue in items:
+        order_day = _as_date(order_day)
+        for key in (("total", 0), ("user", user_id or 0)):
+            deltas[(order_day,) + key][1] += units or 0
+        for key in (("book", book_id or 0), ("genre", genre_id or 0)):
+            row = deltas[(order_day,) + key]
+            row[0] += lines
+            row[1] += units or 0
+            row[2] += revenue or 0
+
+    db.query(models.SalesRollup).filter(models.SalesRollup.day >= start, models.SalesRollup.day < end) \
+        .delete(synchronize_session=False)
+    rows = _rows(deltas)
+    if rows:
+        db.execute(models.SalesRollup.__table__.insert(), rows)
+    db.commit()
+    return len(rows)
+
+def backfill(start: date = None, end: date = None, chunk_days: int = 1):
+    db = SessionLocal()
+    try:
+        if start is None:
+            first = db.query(func.min(models.Order.created_at)).scalar()
+            if first is None:
+                return 0
+            start = _as_date(first)
+        today = datetime.utcnow().date()
+        if end is None:
+            end = today
+        if end > today:
+            print(f"Warning: rebuilding {today} while orders are being placed discards rollups written during the rebuild")
+
+        written = 0
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days), end)
+            written += _rebuild_chunk(db, chunk_start, chunk_end)
+            print(f"Rebuilt sales rollups for {chunk_start} to {chunk_end}")
+            chunk_start = chunk_end
+        return written
+    finally:
+        db.close()
+
+def daily_totals(db, start: date, end: date):
+    rows = db.query(models.SalesRollup).filter(
+        models.SalesRollup.dimension == "total",
+        models.SalesRollup.day >= start,
+        models.SalesRollup.day <= end
+    ).order_by(models.SalesRollup.day).all()
+    return [{"day": row.day, "orders": row.orders, "units": row.units, "revenue": row.revenue} for row in rows]
+
+def top(db, dimension: str, start: date, end: date, limit: int = 10):
+    revenue = func.sum(models.SalesRollup.revenue)
+    rows = db.query(models.SalesRollup.key_id, func.sum(models.SalesRollup.orders), func.sum(models.SalesRollup.units), revenue) \
+        .filter(
+            models.SalesRollup.dimension == dimension,
+            models.SalesRollup.day >= start,
+            models.SalesRollup.day <= end
+        ) \
+        .group_by(models.SalesRollup.key_id).order_by(revenue.desc()).limit(limit).all()
+    return [{f"{dimension}_id": key_id, "orders": orders, "units": units, "revenue": total} for key_id, orders, units, total in rows]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild sales rollups from historical orders")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="Exclusive end day, defaults to today so the live day is left to checkout; only pass a later day while no orders are being placed")
+    parser.add_argument("--chunk-days", type=int, default=1)
+    args = parser.parse_args()
+    rows = backfill(args.start, args.end, args.chunk_days)
+    print(f"Wrote {rows} rollup rows")
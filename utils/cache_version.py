@@ -0,0 +1,61 @@
+import threading
+import time
+import models
+from database import SessionLocal
+
+def current_version(db, name: str) -> int:
+    row = db.query(models.CacheVersion.version).filter(models.CacheVersion.name == name).first()
+    return row[0] if row else 0
+
+def bump_version(db, name: str):
+    updated = db.query(models.CacheVersion).filter(models.CacheVersion.name == name) \
+        .update({models.CacheVersion.version: models.CacheVersion.version + 1}, synchronize_session=False)
+    if not updated:
+        db.add(models.CacheVersion(name=name, version=1))
+
+def set_version(db, name: str, version: int):
+    updated = db.query(models.CacheVersion).filter(models.CacheVersion.name == name) \
+        .update({models.CacheVersion.version: version}, synchronize_session=False)
+    if not updated:
+        db.add(models.CacheVersion(name=name, version=version))
+
+class VersionedCache:
+    def __init__(self, name: str, check_seconds: int):
+        self.name = name
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    def _load(self, db, version: int):
+        raise NotImplementedError
+
+    def _current_version(self, db):
+        return current_version(db, self.name)
+
+    def snapshot(self, db=None):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_seconds:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._snapshot
+            own_session = db is None
+            if own_session:
+                db = SessionLocal()
+            try:
+                version = self._current_version(db)
+                if self._snapshot is None or version != self._snapshot.version:
+                    self._snapshot = self._load(db, version)
+                self._checked_at = time.monotonic()
+            finally:
+                if own_session:
+                    db.close()
+            return self._snapshot
+
+    def bump(self, db):
+        bump_version(db, self.name)
+
+    def invalidate(self, changes=None):
+        with self._lock:
+            self._snapshot = None
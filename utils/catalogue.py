@@ -0,0 +1,179 @@
+import itertools
+import sys
+from datetime import datetime, timedelta
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import func
+import models
+from config import settings
+from utils.cache_version import VersionedCache
+from utils.commit_hooks import on_commit
+
+CATALOGUE_NAME = "catalogue"
+BOOK_COLUMNS = ("id", "title", "price", "genre_id", "quantity", "instock")
+DATA_COLUMNS = ("ids", "titles", "prices", "genre_ids", "quantities", "instock")
+SORT_COLUMNS = {"id": "ids", "title": "titles", "price": "prices", "genre_id": "genre_ids", "quantity": "quantities", "instock": "instock"}
+
+class CatalogueColumns(NamedTuple):
+    version: tuple
+    generation: int
+    loaded_at: datetime
+    ids: np.ndarray
+    titles: np.ndarray
+    prices: np.ndarray
+    genre_ids: np.ndarray
+    quantities: np.ndarray
+    instock: np.ndarray
+
+    @classmethod
+    def build(cls, version: tuple, generation: int, loaded_at: datetime, rows):
+        rows = sorted(rows, key=lambda row: row[0])
+        ids, titles, prices, genre_ids, quantities, instock = zip(*rows) if rows else ((),) * 6
+        return cls(
+            version,
+            generation,
+            loaded_at,
+            np.array(ids, dtype=np.int64),
+            np.array([sys.intern(title) for title in titles], dtype=object),
+            np.array(prices, dtype=np.int64),
+            np.array([genre_id or 0 for genre_id in genre_ids], dtype=np.int64),
+            np.array(quantities, dtype=np.int64),
+            np.array(instock, dtype=bool)
+        )
+
+    def data(self):
+        return tuple(getattr(self, column) for column in DATA_COLUMNS)
+
+    def rows(self):
+        return list(zip(*(column.tolist() for column in self.data())))
+
+    def available(self):
+        return self.instock & (self.quantities > 0)
+
+    def patched(self, generation: int, rows):
+        rows = {row[0]: row for row in rows}
+        if not rows:
+            return self._replace(generation=generation)
+        book_ids = np.array(sorted(rows), dtype=np.int64)
+        if not _contains(self.ids, book_ids):
+            keep = ~np.isin(self.ids, book_ids)
+            kept = [row for row, keep_row in zip(self.rows(), keep.tolist()) if keep_row]
+            return CatalogueColumns.build(self.version, generation, self.loaded_at, kept + list(rows.values()))
+
+        positions = np.searchsorted(self.ids, book_ids)
+        changed = {}
+        for index, column in enumerate(DATA_COLUMNS[1:], start=1):
+            values = [rows[book_id][index] for book_id in book_ids.tolist()]
+            if column == "titles":
+                values = [sys.intern(title) for title in values]
+            elif column == "genre_ids":
+                values = [genre_id or 0 for genre_id in values]
+            current = getattr(self, column)
+            if current[positions].tolist() != values:
+                updated = current.copy()
+                updated[positions] = values
+                changed[column] = updated
+        return self._replace(generation=generation, **changed)
+
+def _row(values):
+    return (values["id"], values["title"], values["price"], values["genre_id"] or 0, values["quantity"], bool(values["instock"]))
+
+def _contains(ids, book_ids):
+    book_ids = np.array(sorted(book_ids), dtype=np.int64)
+    positions = np.searchsorted(ids, book_ids)
+    return bool(np.all(positions < len(ids))) and bool(np.all(ids[positions.clip(max=len(ids) - 1)] == book_ids))
+
+def _window(keys, skip: int, limit: int):
+    end = skip + limit
+    if end < len(keys):
+        top = np.argpartition(keys, end - 1)[:end]
+        return top[np.argsort(keys[top])][skip:]
+    return np.argsort(keys)[skip:end]
+
+class CatalogueProjection(VersionedCache):
+    def __init__(self, name: str, check_seconds: int, settle_seconds: int):
+        super().__init__(name, check_seconds)
+        self.settle = timedelta(seconds=settle_seconds)
+        self._generations = itertools.count(1)
+        self._title_ranks = None
+
+    def _query(self, db):
+        return db.query(models.Book.id, models.Book.title, models.Book.price, models.Book.genre_id,
+                        models.Book.quantity, models.Book.instock)
+
+    def _current_version(self, db):
+        return db.query(func.max(models.Book.updated_at)).scalar(), db.query(func.count()).select_from(models.Book).scalar()
+
+    def _load(self, db, version: tuple) -> CatalogueColumns:
+        loaded_at = datetime.utcnow()
+        previous = self._snapshot
+        if previous is not None:
+            changed = self._query(db).filter(models.Book.updated_at >= previous.loaded_at - self.settle).all()
+            patched = previous.patched(next(self._generations), [tuple(row) for row in changed])
+            if len(patched.ids) == version[1]:
+                return patched._replace(version=version, loaded_at=loaded_at)
+        rows = self._query(db).yield_per(50000)
+        return CatalogueColumns.build(version, next(self._generations), loaded_at, [tuple(row) for row in rows])
+
+    def apply_changes(self, changes):
+        removed = set()
+        added = {}
+        for old, new in changes:
+            if old is not None:
+                removed.add(old["id"])
+                added.pop(old["id"], None)
+            if new is not None:
+                added[new["id"]] = _row(new)
+
+        with self._lock:
+            columns = self._snapshot
+            if columns is None:
+                return
+            if removed - added.keys():
+                keep = ~np.isin(columns.ids, list(removed))
+                kept = [row for row, keep_row in zip(columns.rows(), keep.tolist()) if keep_row]
+                columns = CatalogueColumns.build(columns.version, columns.generation, columns.loaded_at, kept)
+            self._snapshot = columns.patched(next(self._generations), added.values())
+
+    def _ranks(self, columns: CatalogueColumns):
+        cached = self._title_ranks
+        if cached is not None and cached[0] is columns.titles:
+            return cached[1]
+        ranks = np.empty(len(columns.ids), dtype=np.int64)
+        ranks[np.argsort(columns.titles, kind="stable")] = np.arange(len(columns.ids))
+        self._title_ranks = (columns.titles, ranks)
+        return ranks
+
+    def browse(self, columns: CatalogueColumns, genre_id: int = None, min_price: int = None, max_price: int = None,
+               is_available: bool = None, sort_by: str = "title", sort_order: str = "asc", skip: int = 0, limit: int = 10):
+        mask = np.ones(len(columns.ids), dtype=bool)
+        if genre_id:
+            mask &= columns.genre_ids == genre_id
+        if min_price:
+            mask &= columns.prices >= min_price
+        if max_price:
+            mask &= columns.prices <= max_price
+        if is_available is not None:
+            mask &= columns.available() == is_available
+
+        selected = np.flatnonzero(mask)
+        if limit <= 0 or not len(selected):
+            return []
+        values = self._ranks(columns) if sort_by == "title" else getattr(columns, SORT_COLUMNS[sort_by])
+        values = values[selected].astype(np.int64)
+        if sort_order == "desc":
+            values = -values
+        keys = values * len(columns.ids) + selected
+        picked = selected[_window(keys, max(skip, 0), limit)]
+        return [{"id": book_id, "title": title} for book_id, title in zip(columns.ids[picked].tolist(), columns.titles[picked].tolist())]
+
+    def memory_bytes(self):
+        columns = self._snapshot
+        if columns is None:
+            return 0
+        titles = {id(title): sys.getsizeof(title) for title in columns.titles.tolist()}
+        return sum(column.nbytes for column in columns.data()) + sum(titles.values())
+
+catalogue = CatalogueProjection(CATALOGUE_NAME, settings.CATALOGUE_CHECK_SECONDS, settings.CATALOGUE_SETTLE_SECONDS)
+
+on_commit(models.Book, BOOK_COLUMNS, catalogue.apply_changes)
@@ -0,0 +1,54 @@
+from sqlalchemy import event, inspect
+from database import SessionLocal
+
+_watchers = {}
+
+def on_commit(model, columns, callback):
+    watcher = _watchers.setdefault(model, {"columns": set(), "callbacks": []})
+    watcher["columns"].update(columns)
+    watcher["callbacks"].append(callback)
+
+def _old_values(obj, columns):
+    state = inspect(obj)
+    values = {}
+    for column in columns:
+        history = state.attrs[column].history
+        values[column] = history.deleted[0] if history.deleted else state.dict.get(column)
+    return values
+
+def _new_values(obj, columns):
+    return {column: getattr(obj, column) for column in columns}
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changes(session, flush_context):
+    if not _watchers:
+        return
+    changes = session.info.setdefault("row_changes", [])
+    for obj in session.new:
+        watcher = _watchers.get(type(obj))
+        if watcher:
+            changes.append((type(obj), None, _new_values(obj, watcher["columns"])))
+    for obj in session.dirty:
+        watcher = _watchers.get(type(obj))
+        if watcher and session.is_modified(obj, include_collections=False):
+            changes.append((type(obj), _old_values(obj, watcher["columns"]), _new_values(obj, watcher["columns"])))
+    for obj in session.deleted:
+        watcher = _watchers.get(type(obj))
+        if watcher:
+            changes.append((type(obj), _old_values(obj, watcher["columns"]), None))
+
+@event.listens_for(SessionLocal, "after_commit")
+def _dispatch_changes(session):
+    changes = session.info.pop("row_changes", None)
+    if not changes:
+        return
+    by_model = {}
+    for model, old, new in changes:
+        by_model.setdefault(model, []).append((old, new))
+    for model, model_changes in by_model.items():
+        for callback in _watchers[model]["callbacks"]:
+            callback(model_changes)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("row_changes", None)
@@ -0,0 +1,124 @@
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from fastapi import Request, Response
+from config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "+json", "+xml")
+
+class GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+class BrotliStream:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+class ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+# name: (stream class, level for per-request compression, level for cached bodies)
+ENCODINGS = {"gzip": (GzipStream, 6, 9)}
+if brotli is not None:
+    ENCODINGS["br"] = (BrotliStream, 4, 11)
+if zstandard is not None:
+    ENCODINGS["zstd"] = (ZstdStream, 3, 9)
+PREFERENCE = tuple(name for name in ("zstd", "br", "gzip") if name in ENCODINGS)
+
+def negotiate(accept_encoding: str):
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.strip()] = weight
+    default = weights.get("*", 0.0)
+    candidates = [(weights.get(name, default), -rank, name) for rank, name in enumerate(PREFERENCE)]
+    weight, _, name = max(candidates, default=(0.0, 0, None))
+    return name if weight > 0 else None
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return any(marker in content_type for marker in COMPRESSIBLE_TYPES)
+
+def open_stream(encoding: str, cached: bool = False):
+    stream, dynamic_level, cached_level = ENCODINGS[encoding]
+    return stream(cached_level if cached else dynamic_level)
+
+def compress(data: bytes, encoding: str, cached: bool = False) -> bytes:
+    stream = open_stream(encoding, cached)
+    return stream.compress(data) + stream.flush()
+
+def render_json(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+class PrecompressedCache:
+    def __init__(self, max_entries: int, minimum_size: int):
+        self.max_entries = max_entries
+        self.minimum_size = minimum_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _entry(self, key, generation: int, render):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                return entry
+        entry = (generation, render_json(render()), {})
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def response(self, request: Request, key, generation: int, render, headers: dict = None) -> Response:
+        _, body, encoded = self._entry(key, generation, render)
+        headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+        encoding = negotiate(request.headers.get("accept-encoding", ""))
+        if encoding is None or len(body) < self.minimum_size:
+            return Response(body, media_type="application/json", headers=headers)
+        data = encoded.get(encoding)
+        if data is None:
+            data = encoded[encoding] = compress(body, encoding, cached=True)
+        return Response(data, media_type="application/json", headers={**headers, "Content-Encoding": encoding})
+
+listing_cache = PrecompressedCache(settings.LISTING_CACHE_ENTRIES, settings.COMPRESSION_MIN_BYTES)
@@ -0,0 +1,217 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import create_engine, func, select
+import models
+from hashing import hash_password
+from utils.order_lifecycle import PENDING, PAID, SHIPPED, DELIVERED, CANCELLED
+
+CHUNK_ROWS = 20000
+DEFAULT_SEED = 7
+DEFAULT_PASSWORD = "fern-and-folio"
+ADMIN_ID = 1
+STAFF_ID = 2
+
+WORDS = ["River", "Night", "Garden", "Stone", "Winter", "Glass", "Empire", "Shadow", "Letters", "House",
+         "Silent", "Golden", "Last", "Secret", "City", "Ocean", "Storm", "Memory", "Crown", "Forest",
+         "Paper", "Iron", "Summer", "Orchard", "Harbour", "Lantern", "Wild", "Hollow", "Quiet", "Northern"]
+GENRES = ["Fiction", "Mystery", "Fantasy", "Science Fiction", "Romance", "History", "Biography", "Poetry",
+          "Travel", "Cookery", "Philosophy", "Children", "Horror", "Thriller", "Science", "Art"]
+ORDER_STATUSES = np.array([DELIVERED, SHIPPED, PAID, PENDING, CANCELLED])
+ORDER_STATUS_WEIGHTS = [0.6, 0.1, 0.1, 0.12, 0.08]
+
+BOOKS, USERS, CARTS, CART_ITEMS, ORDERS, ORDER_ITEMS = range(6)
+
+class Volumes(NamedTuple):
+    genres: int = 50
+    books: int = 200000
+    users: int = 100000
+    carts: int = 50000
+    orders: int = 500000
+    max_items: int = 4
+    history_days: int = 365
+
+    def scaled(self, factor: float) -> "Volumes":
+        return self._replace(**{field: max(int(getattr(self, field) * factor), 1)
+                                for field in ("books", "users", "carts", "orders")})
+
+def _chunks(total: int):
+    for chunk, start in enumerate(range(0, total, CHUNK_ROWS)):
+        yield chunk, start, min(start + CHUNK_ROWS, total)
+
+def _rng(seed: int, table: int, chunk: int):
+    return np.random.default_rng((seed, table, chunk))
+
+def _timestamps(anchor, seconds_ago):
+    return (np.datetime64(anchor, "us") - seconds_ago.astype("timedelta64[s]")).astype("datetime64[us]").tolist()
+
+def _skewed_ids(rng, upper: int, size: int):
+    return (rng.random(size) ** 2 * upper).astype(np.int64) + 1
+
+def _rows(columns, arrays):
+    return [dict(zip(columns, values)) for values in zip(*(array if isinstance(array, list) else array.tolist() for array in arrays))]
+
+def _lines(rng, volumes: Volumes, prices, first_parent: int, parents: int):
+    counts = rng.integers(1, volumes.max_items + 1, parents)
+    parent_ids = np.repeat(np.arange(first_parent, first_parent + parents), counts)
+    book_ids = _skewed_ids(rng, volumes.books, len(parent_ids))
+    quantities = rng.integers(1, 4, len(parent_ids))
+    return counts, parent_ids, book_ids, quantities, prices[book_ids - 1]
+
+def _genres(volumes: Volumes):
+    names = [GENRES[index % len(GENRES)] + (f" {index // len(GENRES) + 1}" if index >= len(GENRES) else "")
+             for index in range(volumes.genres)]
+    yield _rows(("id", "name"), [list(range(1, volumes.genres + 1)), names])
+
+def _books(volumes: Volumes, seed: int, anchor, prices):
+    for chunk, start, stop in _chunks(volumes.books):
+        rng = _rng(seed, BOOKS, chunk)
+        size = stop - start
+        words = rng.integers(0, len(WORDS), (size, 3))
+        lengths = rng.integers(1, 4, size)
+        titles = [" ".join(WORDS[word] for word in row[:length]) for row, length in zip(words.tolist(), lengths.tolist())]
+        prices[start:stop] = rng.integers(100, 5000, size)
+        yield _rows(("id", "title", "author", "genre_id", "price", "instock", "quantity", "version", "updated_at"), [
+            np.arange(start + 1, stop + 1),
+            titles,
+            [f"Author {author}" for author in rng.integers(1, volumes.books // 20 + 2, size).tolist()],
+            rng.integers(1, volumes.genres + 1, size),
+            prices[start:stop],
+            rng.random(size) > 0.05,
+            rng.integers(0, 41, size),
+            np.ones(size, dtype=np.int64),
+            _timestamps(anchor, rng.integers(0, volumes.history_days * 86400, size))
+        ])
+
+def _users(volumes: Volumes, seed: int):
+    password = hash_password(DEFAULT_PASSWORD)
+    for chunk, start, stop in _chunks(volumes.users):
+        ids = list(range(start + 1, stop + 1))
+        rng = _rng(seed, USERS, chunk)
+        first, last = rng.integers(0, len(WORDS), (2, stop - start)).tolist()
+        yield _rows(("id", "name", "email", "password", "is_verified", "role"), [
+            ids,
+            [f"{WORDS[a]} {WORDS[b]}" for a, b in zip(first, last)],
+            [f"user{user_id}@example.com" for user_id in ids],
+            [password] * len(ids),
+            [True] * len(ids),
+            ["Admin" if user_id == ADMIN_ID else "Staff" if user_id == STAFF_ID else "Customer" for user_id in ids]
+        ])
+
+def _carts(volumes: Volumes, seed: int, anchor, prices, item_ids):
+    for chunk, start, stop in _chunks(volumes.carts):
+        rng = _rng(seed, CARTS, chunk)
+        size = stop - start
+        created = rng.integers(0, 60 * 86400, size)
+        yield models.Cart, _rows(("id", "user_id", "status", "created_at", "updated_at"), [
+            np.arange(start + 1, stop + 1),
+            rng.integers(1, volumes.users + 1, size),
+            ["Active"] * size,
+            _timestamps(anchor, created),
+            _timestamps(anchor, created // 2)
+        ])
+        _, cart_ids, book_ids, quantities, line_prices = _lines(_rng(seed, CART_ITEMS, chunk), volumes, prices, start + 1, size)
+        yield models.CartItem, _rows(("id", "cart_id", "book_id", "quantity", "price"), [
+            np.arange(item_ids[0], item_ids[0] + len(cart_ids)), cart_ids, book_ids, quantities, line_prices
+        ])
+        item_ids[0] += len(cart_ids)
+
+def _orders(volumes: Volumes, seed: int, anchor, prices, item_ids):
+    for chunk, start, stop in _chunks(volumes.orders):
+        rng = _rng(seed, ORDERS, chunk)
+        size = stop - start
+        created = rng.integers(0, volumes.history_days * 86400, size)
+        counts, order_ids, book_ids, quantities, line_prices = _lines(_rng(seed, ORDER_ITEMS, chunk), volumes, prices, start + 1, size)
+        totals = np.add.reduceat(quantities * line_prices, np.cumsum(counts) - counts)
+        yield models.Order, _rows(("id", "user_id", "total_amount", "status", "created_at", "updated_at", "version"), [
+            np.arange(start + 1, stop + 1),
+            _skewed_ids(rng, volumes.users, size),
+            totals,
+            ORDER_STATUSES[rng.choice(len(ORDER_STATUSES), size, p=ORDER_STATUS_WEIGHTS)],
+            _timestamps(anchor, created),
+            _timestamps(anchor, created - np.minimum(created, rng.integers(0, 7 * 86400, size))),
+            np.ones(size, dtype=np.int64)
+        ])
+        yield models.OrderItem, _rows(("id", "order_id", "book_id", "quantity", "price", "amount"), [
+            np.arange(item_ids[0], item_ids[0] + len(order_ids)), order_ids, book_ids, quantities, line_prices,
+            quantities * line_prices
+        ])
+        item_ids[0] += len(order_ids)
+
+@contextmanager
+def _bulk_load(conn):
+    restore = []
+    if conn.dialect.name == "sqlite":
+        restore = [f"PRAGMA {pragma}={conn.exec_driver_sql(f'PRAGMA {pragma}').scalar()}" for pragma in ("synchronous", "journal_mode")]
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+    elif conn.dialect.name == "mysql":
+        unique_checks, foreign_key_checks = conn.exec_driver_sql("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks").one()
+        restore = [f"SET SESSION unique_checks={unique_checks}, foreign_key_checks={foreign_key_checks}"]
+        conn.exec_driver_sql("SET SESSION unique_checks=0, foreign_key_checks=0")
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        for statement in restore:
+            conn.exec_driver_sql(statement)
+        conn.commit()
+
+def generate(engine, volumes: Volumes = Volumes(), seed: int = DEFAULT_SEED, anchor: datetime = None, reset: bool = False, log=print):
+    if reset:
+        models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    anchor = anchor or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    prices = np.zeros(volumes.books, dtype=np.int64)
+
+    counts = {}
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(models.Book.__table__)).scalar():
+            raise RuntimeError("Database already holds books, generate into an empty database or reset it first")
+        with _bulk_load(conn):
+            def load(model, rows):
+                conn.execute(model.__table__.insert(), rows)
+                conn.commit()
+                counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(rows)
+
+
+            started = time.perf_counter()
+            for rows in _genres(volumes):
+                load(models.Genre, rows)
+            for rows in _books(volumes, seed, anchor, prices):
+                load(models.Book, rows)
+            for rows in _users(volumes, seed):
+                load(models.User, rows)
+            for model, rows in _carts(volumes, seed, anchor, prices, [1]):
+                load(model, rows)
+            for model, rows in _orders(volumes, seed, anchor, prices, [1]):
+                load(model, rows)
+                if model is models.OrderItem and counts["orders"] % (CHUNK_ROWS * 10) == 0:
+                    log(f"{counts['orders']} orders written, {time.perf_counter() - started:.1f}s")
+
+    log(f"Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s: "
+        + ", ".join(f"{table} {count}" for table, count in counts.items()))
+    return counts
+
+@contextmanager
+def seeded_database(path: str = None, volumes: Volumes = Volumes(), seed: int = DEFAULT_SEED, anchor: datetime = None, log=print):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = path or os.path.join(workdir, "fern_and_folio.db")
+        url = f"sqlite:///{path}"
+        engine = create_engine(url)
+        try:
+            with engine.connect() as conn:
+                populated = engine.dialect.has_table(conn, models.Book.__tablename__) and \
+                    conn.execute(select(func.count()).select_from(models.Book.__table__)).scalar()
+            if populated:
+                log(f"Reusing generated data in {path}")
+            else:
+                generate(engine, volumes, seed, anchor, log=log)
+        finally:
+            engine.dispose()
+        yield url
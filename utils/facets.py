@@ -0,0 +1,169 @@
+import threading
+from collections import Counter
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import and_, case, func, or_
+import models
+from config import settings
+from utils.catalogue import catalogue
+from utils.commit_hooks import on_commit
+
+BOOK_COLUMNS = ("genre_id", "price", "instock", "quantity")
+PRICE_BITS = 40
+MAX_PRICE = (1 << PRICE_BITS) - 1
+
+def _in_stock(instock, quantity):
+    return bool(instock) and (quantity or 0) > 0
+
+def _cell(row):
+    return (row["genre_id"] or 0, row["price"], _in_stock(row["instock"], row["quantity"]))
+
+class FacetCells(NamedTuple):
+    genre_ids: np.ndarray
+    keys: np.ndarray
+    counts: np.ndarray
+    cumulative: np.ndarray
+    first_bucket: int
+    buckets: np.ndarray
+
+    @classmethod
+    def build(cls, cells, bucket_size: int):
+        cells = {cell: count for cell, count in cells.items() if count > 0}
+        genres, prices, stock, counts = (np.array(column, dtype=np.int64) for column in
+                                         (zip(*((genre, price, in_stock, count) for (genre, price, in_stock), count in cells.items()))
+                                          if cells else ((),) * 4))
+        genre_ids = np.unique(genres)
+        keys = ((np.searchsorted(genre_ids, genres) * 2 + stock) << PRICE_BITS) | prices
+        order = np.argsort(keys)
+        return cls._from_keys(genre_ids, keys[order], counts[order], bucket_size)
+
+    @classmethod
+    def from_columns(cls, genres, prices, stock, bucket_size: int):
+        genre_ids = np.unique(genres)
+        keys = ((np.searchsorted(genre_ids, genres) * 2 + stock.astype(np.int64)) << PRICE_BITS) | np.clip(prices, 0, MAX_PRICE)
+        keys, counts = np.unique(keys, return_counts=True)
+        return cls._from_keys(genre_ids, keys, counts.astype(np.int64), bucket_size)
+
+    @classmethod
+    def _from_keys(cls, genre_ids, keys, counts, bucket_size: int):
+        groups = keys >> PRICE_BITS
+        bucket_ids = (keys & MAX_PRICE) // bucket_size
+        first_bucket = int(bucket_ids.min()) if len(bucket_ids) else 0
+        buckets = np.zeros((len(genre_ids) * 2, int(bucket_ids.max()) - first_bucket + 1 if len(bucket_ids) else 0), dtype=np.int64)
+        np.add.at(buckets, (groups, bucket_ids - first_bucket), counts)
+        return cls(genre_ids, keys, counts, np.concatenate(([0], np.cumsum(counts))), first_bucket, buckets)
+
+    def covers(self, cell, bucket_size: int) -> bool:
+        genre_id, price, _ = cell
+        position = np.searchsorted(self.genre_ids, genre_id)
+        bucket = price // bucket_size - self.first_bucket
+        return position < len(self.genre_ids) and self.genre_ids[position] == genre_id \
+            and 0 <= price <= MAX_PRICE and 0 <= bucket < self.buckets.shape[1]
+
+    def apply(self, deltas, bucket_size: int):
+        genres, prices, stock, counts = (np.array(column, dtype=np.int64) for column in
+                                         zip(*((genre, price, in_stock, count) for (genre, price, in_stock), count in deltas.items())))
+        groups = np.searchsorted(self.genre_ids, genres) * 2 + stock
+        delta_keys = (groups << PRICE_BITS) | prices
+        order = np.argsort(delta_keys)
+        groups, prices, counts, delta_keys = groups[order], prices[order], counts[order], delta_keys[order]
+        positions = np.searchsorted(self.keys, delta_keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == delta_keys[found]
+
+        keys = np.insert(self.keys, positions[~found], delta_keys[~found])
+        totals = np.insert(self.counts, positions[~found], 0)
+        np.add.at(totals, np.searchsorted(keys, delta_keys), counts)
+        keep = totals > 0
+        keys, totals = keys[keep], totals[keep]
+
+        buckets = self.buckets.copy()
+        np.add.at(buckets, (groups, prices // bucket_size - self.first_bucket), counts)
+        return self._replace(keys=keys, counts=totals, cumulative=np.concatenate(([0], np.cumsum(totals))), buckets=buckets)
+
+class CatalogueFacets:
+    def __init__(self, bucket_size: int):
+        self.bucket_size = bucket_size
+        self._lock = threading.Lock()
+        self._cells = None
+        self._version = None
+
+    def _grouped_counts(self, query):
+        in_stock = case((and_(models.Book.instock.is_(True), models.Book.quantity > 0), 1), else_=0)
+        rows = query.with_entities(models.Book.genre_id, models.Book.price, in_stock, func.count(models.Book.id)) \
+            .group_by(models.Book.genre_id, models.Book.price, in_stock).all()
+        return FacetCells.build({(genre_id or 0, min(max(price, 0), MAX_PRICE), bool(stock)): count
+                                 for genre_id, price, stock, count in rows}, self.bucket_size)
+
+    def _snapshot(self, db) -> FacetCells:
+        columns = catalogue.snapshot(db)
+        with self._lock:
+            if self._cells is None or self._version != columns.version:
+                self._cells = FacetCells.from_columns(columns.genre_ids, columns.prices, columns.available(), self.bucket_size)
+                self._version = columns.version
+            return self._cells
+
+    def apply_changes(self, changes):
+        deltas = Counter()
+        for old, new in changes:
+            if old is not None:
+                deltas[_cell(old)] -= 1
+            if new is not None:
+                deltas[_cell(new)] += 1
+        deltas = {cell: count for cell, count in deltas.items() if count}
+        with self._lock:
+            if self._cells is None or not deltas:
+                return
+            if all(self._cells.covers(cell, self.bucket_size) for cell in deltas):
+                self._cells = self._cells.apply(deltas, self.bucket_size)
+            else:
+                self._cells = None
+
+    def invalidate(self):
+        with self._lock:
+            self._cells = None
+
+    def bucket(self, price):
+        start = (price // self.bucket_size) * self.bucket_size
+        return start, start + self.bucket_size - 1
+
+    def counts(self, db, search: str = None, genre_id: int = None, min_price: int = None,
+               max_price: int = None, is_available: bool = None):
+        if search:
+            query = db.query(models.Book).filter(
+                or_(
+                    models.Book.title.ilike(f"%{search}%"),
+                    models.Book.author.ilike(f"%{search}%")
+                )
+            )
+            cells = self._grouped_counts(query)
+        else:
+            cells = self._snapshot(db)
+
+        low = min(max(min_price or 0, 0), MAX_PRICE)
+        high = min(max(max_price, 0), MAX_PRICE) if max_price else MAX_PRICE
+        groups = np.arange(len(cells.genre_ids) * 2, dtype=np.int64) << PRICE_BITS
+        in_range = cells.cumulative[np.searchsorted(cells.keys, groups | high, side="right")] \
+            - cells.cumulative[np.searchsorted(cells.keys, groups | low, side="left")]
+        in_range = np.maximum(in_range, 0).reshape(-1, 2)
+
+        stock = slice(None) if is_available is None else slice(int(is_available), int(is_available) + 1)
+        genre_mask = np.ones(len(cells.genre_ids), dtype=bool) if not genre_id else cells.genre_ids == genre_id
+        genres = in_range[:, stock].sum(axis=1)
+        price_buckets = cells.buckets.reshape(len(cells.genre_ids), 2, cells.buckets.shape[1])[genre_mask][:, stock].sum(axis=(0, 1))
+
+        genre_counts = [{"genre_id": key or None, "count": count}
+                        for key, count in zip(cells.genre_ids.tolist(), genres.tolist()) if count]
+        genre_counts.sort(key=lambda item: (item["genre_id"] is None, item["genre_id"] or 0))
+        return {
+            "total": int(genres[genre_mask].sum()),
+            "in_stock": int(in_range[genre_mask, 1].sum()),
+            "genres": genre_counts,
+            "price_buckets": [{"min_price": start, "max_price": end, "count": count}
+                              for (start, end), count in ((self.bucket((cells.first_bucket + index) * self.bucket_size), count)
+                                                          for index, count in enumerate(price_buckets.tolist())) if count]
+        }
+
+catalogue_facets = CatalogueFacets(settings.FACET_PRICE_BUCKET_SIZE)
+
+on_commit(models.Book, BOOK_COLUMNS, catalogue_facets.apply_changes)
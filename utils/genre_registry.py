@@ -0,0 +1,44 @@
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+import models
+from config import settings
+from utils.cache_version import VersionedCache
+from utils.commit_hooks import on_commit
+
+REGISTRY_NAME = "genre"
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+class GenreSnapshot(NamedTuple):
+    version: int
+    by_id: MappingProxyType
+    by_name: MappingProxyType
+
+    def all(self):
+        return [{"id": genre_id, "name": name} for genre_id, name in self.by_id.items()]
+
+    def get(self, genre_id: int):
+        name = self.by_id.get(genre_id)
+        if name is None:
+            return None
+        return {"id": genre_id, "name": name}
+
+    def id_for(self, name: str, default: Optional[int] = None):
+        return self.by_name.get(normalize_name(name), default)
+
+class GenreRegistry(VersionedCache):
+    def _load(self, db, version: int) -> GenreSnapshot:
+        genres = db.query(models.Genre.id, models.Genre.name).order_by(models.Genre.id).all()
+        by_id = {genre_id: name for genre_id, name in genres}
+        by_name = {}
+        for genre_id, name in genres:
+            by_name.setdefault(normalize_name(name), genre_id)
+        return GenreSnapshot(version, MappingProxyType(by_id), MappingProxyType(by_name))
+
+genre_registry = GenreRegistry(REGISTRY_NAME, settings.GENRE_REGISTRY_CHECK_SECONDS)
+
+def bump_version(db):
+    genre_registry.bump(db)
+
+on_commit(models.Genre, ("id", "name"), genre_registry.invalidate)
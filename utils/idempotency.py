@@ -0,0 +1,171 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+import models
+from config import settings
+from database import SessionLocal
+
+def _request_hash(payload) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode()).hexdigest()
+
+def _still_running(key: str):
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"A request with Idempotency-Key {key} is still in progress")
+
+def _lease_lost(key: str):
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"The reservation for Idempotency-Key {key} was taken over by a retry")
+
+def _key_reused():
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Idempotency-Key was already used with a different request body")
+
+def _lease_time():
+    return datetime.utcnow().replace(microsecond=0)
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int, wait_seconds: int):
+        self.max_entries = max_entries
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._inflight = {}
+
+    def _cache_get(self, cache_key):
+        entry = self._cache.get(cache_key)
+        if entry is not None:
+            self._cache.move_to_end(cache_key)
+        return entry
+
+    def _cache_put(self, cache_key, entry):
+        with self._lock:
+            self._cache[cache_key] = entry
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _replay(self, entry, request_hash: str):
+        stored_hash, status_code, body = entry
+        if stored_hash != request_hash:
+            raise _key_reused()
+        return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+    def _query(self, db, cache_key):
+        user_id, scope, key = cache_key
+        return db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.scope == scope,
+            models.IdempotencyKey.key == key
+        )
+
+    def _take_over(self, db, cache_key):
+        reserved_at = _lease_time()
+        expired = reserved_at - timedelta(seconds=self.wait_seconds)
+        taken = self._query(db, cache_key).filter(
+            models.IdempotencyKey.status_code.is_(None),
+            func.coalesce(models.IdempotencyKey.reserved_at, models.IdempotencyKey.created_at) < expired
+        ).update({models.IdempotencyKey.reserved_at: reserved_at}, synchronize_session=False)
+        db.commit()
+        return reserved_at if taken else None
+
+    def _reserve(self, db, cache_key, request_hash: str):
+        user_id, scope, key = cache_key
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            reserved_at = _lease_time()
+            db.add(models.IdempotencyKey(user_id=user_id, scope=scope, key=key, request_hash=request_hash,
+                                         created_at=datetime.utcnow(), reserved_at=reserved_at))
+            try:
+                db.commit()
+                return reserved_at, None
+            except IntegrityError:
+                db.rollback()
+
+            while time.monotonic() < deadline:
+                row = self._query(db, cache_key).with_entities(
+                    models.IdempotencyKey.request_hash, models.IdempotencyKey.status_code, models.IdempotencyKey.response_body
+                ).first()
+                db.rollback()
+                if row is None:
+                    break
+                stored_hash, status_code, response_body = row
+                if status_code is not None:
+                    return None, (stored_hash, status_code, json.loads(response_body))
+                if stored_hash != request_hash:
+                    raise _key_reused()
+                reserved_at = self._take_over(db, cache_key)
+                if reserved_at is not None:
+                    return reserved_at, None
+                time.sleep(0.05)
+            else:
+                raise _still_running(key)
+
+    def _execute(self, db, cache_key, request_hash: str, handler):
+        reservations = SessionLocal()
+        try:
+            reserved_at, stored = self._reserve(reservations, cache_key, request_hash)
+            if stored is not None:
+                self._cache_put(cache_key, stored)
+                return self._replay(stored, request_hash)
+
+            try:
+                body = jsonable_encoder(handler())
+                completed = self._query(db, cache_key).filter(
+                    models.IdempotencyKey.reserved_at == reserved_at,
+                    models.IdempotencyKey.status_code.is_(None)
+                ).update({
+                    models.IdempotencyKey.status_code: status.HTTP_200_OK,
+                    models.IdempotencyKey.response_body: json.dumps(body)
+                }, synchronize_session=False)
+                if not completed:
+                    raise _lease_lost(cache_key[2])
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._query(reservations, cache_key).filter(
+                    models.IdempotencyKey.reserved_at == reserved_at,
+                    models.IdempotencyKey.status_code.is_(None)
+                ).delete(synchronize_session=False)
+                reservations.commit()
+                raise
+
+            self._cache_put(cache_key, (request_hash, status.HTTP_200_OK, body))
+            return body
+        finally:
+            reservations.close()
+
+    def run(self, key: str, user_id: int, scope: str, payload, db, handler):
+        if not key:
+            body = handler()
+            db.commit()
+            return body
+
+        cache_key = (user_id, scope, key)
+        request_hash = _request_hash(payload)
+        while True:
+            with self._lock:
+                entry = self._cache_get(cache_key)
+                event = self._inflight.get(cache_key)
+                owner = entry is None and event is None
+                if owner:
+                    event = self._inflight[cache_key] = threading.Event()
+            if entry is not None:
+                return self._replay(entry, request_hash)
+            if owner:
+                break
+            if not event.wait(self.wait_seconds):
+                raise _still_running(key)
+
+        try:
+            return self._execute(db, cache_key, request_hash, handler)
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            event.set()
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_WAIT_SECONDS)
@@ -0,0 +1,105 @@
+import hashlib
+import mmap
+import multiprocessing
+import threading
+import time
+from config import settings
+
+KEY, FAILURES, LAST_FAILURE_MS, BLOCKED_UNTIL_MS = range(4)
+SLOT_FIELDS = 4
+BUCKET_SLOTS = 2
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little", signed=True) or 1
+
+class FailureTable:
+    def __init__(self, slots: int, shared: bool = False):
+        self.buckets = max(slots // BUCKET_SLOTS, 1)
+        size = self.buckets * BUCKET_SLOTS * SLOT_FIELDS * 8
+        self._buffer = mmap.mmap(-1, size) if shared else bytearray(size)
+        self._counters = memoryview(self._buffer).cast("q")
+        self._lock = multiprocessing.Lock() if shared else threading.Lock()
+
+    def _slot(self, key_hash: int, now_ms: int, stale_ms: int, claim: bool):
+        counters = self._counters
+        bucket = (key_hash % self.buckets) * BUCKET_SLOTS * SLOT_FIELDS
+        slots = range(bucket, bucket + BUCKET_SLOTS * SLOT_FIELDS, SLOT_FIELDS)
+        for slot in slots:
+            if counters[slot + KEY] == key_hash:
+                return slot
+        if not claim:
+            return None
+        victim = min(slots, key=lambda slot: (
+            counters[slot + KEY] != 0 and now_ms - counters[slot + LAST_FAILURE_MS] <= stale_ms,
+            counters[slot + FAILURES],
+            counters[slot + LAST_FAILURE_MS]
+        ))
+        counters[victim:victim + SLOT_FIELDS] = memoryview(bytes(SLOT_FIELDS * 8)).cast("q")
+        counters[victim + KEY] = key_hash
+        return victim
+
+    def blocked_until(self, key: str) -> int:
+        with self._lock:
+            slot = self._slot(_key_hash(key), 0, 0, claim=False)
+            return 0 if slot is None else self._counters[slot + BLOCKED_UNTIL_MS]
+
+    def fail(self, key: str, now_ms: int, reset_ms: int, free_attempts: int, base_ms: int, max_ms: int) -> int:
+        counters = self._counters
+        with self._lock:
+            slot = self._slot(_key_hash(key), now_ms, reset_ms, claim=True)
+            if now_ms - counters[slot + LAST_FAILURE_MS] > reset_ms:
+                counters[slot + FAILURES] = 0
+            counters[slot + FAILURES] += 1
+            counters[slot + LAST_FAILURE_MS] = now_ms
+            excess = counters[slot + FAILURES] - free_attempts
+            if excess >= 0:
+                counters[slot + BLOCKED_UNTIL_MS] = now_ms + min(base_ms << min(excess, 40), max_ms)
+            return counters[slot + FAILURES]
+
+    def clear(self, key: str):
+        with self._lock:
+            slot = self._slot(_key_hash(key), 0, 0, claim=False)
+            if slot is not None:
+                self._counters[slot:slot + SLOT_FIELDS] = memoryview(bytes(SLOT_FIELDS * 8)).cast("q")
+
+class LoginThrottle:
+    def __init__(self, slots: int, account_attempts: int, ip_attempts: int, backoff_base_seconds: float,
+                 backoff_max_seconds: float, reset_seconds: float, clock=time.time):
+        self.slots = slots
+        self.account_attempts = account_attempts
+        self.ip_attempts = ip_attempts
+        self.base_ms = max(int(backoff_base_seconds * 1000), 1)
+        self.max_ms = int(backoff_max_seconds * 1000)
+        self.reset_ms = int(reset_seconds * 1000)
+        self.clock = clock
+        self.table = FailureTable(slots)
+
+    def enable_shared(self):
+        self.table = FailureTable(self.slots, shared=True)
+        return self.table
+
+    def _keys(self, username: str, client_ip: str):
+        return f"account:{username.strip().lower()}", f"ip:{client_ip}"
+
+    def retry_after(self, username: str, client_ip: str) -> int:
+        now_ms = int(self.clock() * 1000)
+        blocked_until = max(self.table.blocked_until(key) for key in self._keys(username, client_ip))
+        return -(-(blocked_until - now_ms) // 1000) if blocked_until > now_ms else 0
+
+    def record_failure(self, username: str, client_ip: str):
+        now_ms = int(self.clock() * 1000)
+        account, ip = self._keys(username, client_ip)
+        self.table.fail(account, now_ms, self.reset_ms, self.account_attempts, self.base_ms, self.max_ms)
+        self.table.fail(ip, now_ms, self.reset_ms, self.ip_attempts, self.base_ms, self.max_ms)
+
+    def record_success(self, username: str):
+        self.table.clear(self._keys(username, "")[0])
+
+login_throttle = LoginThrottle(
+    settings.LOGIN_THROTTLE_SLOTS,
+    settings.LOGIN_ACCOUNT_MAX_FAILURES,
+    settings.LOGIN_IP_MAX_FAILURES,
+    settings.LOGIN_BACKOFF_BASE_SECONDS,
+    settings.LOGIN_BACKOFF_MAX_SECONDS,
+    settings.LOGIN_FAILURE_RESET_SECONDS
+)
@@ -0,0 +1,161 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+import models
+from config import settings
+from database import SessionLocal
+from utils.recommendations import apply_new_orders
+from utils.sessions import REVOCATION_WINDOW
+
+LEASE_NAME = "maintenance"
+
+def _purge_in_batches(db, model, condition, batch_size: int, before_delete=None):
+    deleted = 0
+    while True:
+        ids = [row[0] for row in db.query(model.id).filter(condition).order_by(model.id).limit(batch_size).all()]
+        if not ids:
+            break
+        if before_delete:
+            before_delete(db, ids)
+        db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+def purge_pending_registrations(db, now: datetime, batch_size: int):
+    return _purge_in_batches(db, models.PendingRegistration, models.PendingRegistration.expires_at < now, batch_size)
+
+def purge_verification_tokens(db, now: datetime, batch_size: int):
+    condition = or_(models.EmailVerificationToken.expires_at < now, models.EmailVerificationToken.used.is_(True))
+    return _purge_in_batches(db, models.EmailVerificationToken, condition, batch_size)
+
+def _delete_cart_items(db, cart_ids):
+    db.query(models.CartItem).filter(models.CartItem.cart_id.in_(cart_ids)).delete(synchronize_session=False)
+
+def purge_stale_carts(db, now: datetime, batch_size: int):
+    cutoff = now - timedelta(days=settings.CART_STALE_DAYS)
+    return _purge_in_batches(db, models.Cart, models.Cart.updated_at < cutoff, batch_size, before_delete=_delete_cart_items)
+
+def purge_idempotency_keys(db, now: datetime, batch_size: int):
+    cutoff = now - timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+    return _purge_in_batches(db, models.IdempotencyKey, models.IdempotencyKey.created_at < cutoff, batch_size)
+
+def purge_user_sessions(db, now: datetime, batch_size: int):
+    condition = or_(models.UserSession.expires_at < now, models.UserSession.revoked_at < now - REVOCATION_WINDOW)
+    return _purge_in_batches(db, models.UserSession, condition, batch_size)
+
+TASKS = {
+    "pending_registrations": purge_pending_registrations,
+    "verification_tokens": purge_verification_tokens,
+    "stale_carts": purge_stale_carts,
+    "idempotency_keys": purge_idempotency_keys,
+    "user_sessions": purge_user_sessions,
+    "recommendations": apply_new_orders
+}
+
+class MaintenanceScheduler:
+    def __init__(self, interval_seconds: int, batch_size: int):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.lease_seconds = interval_seconds * 2
+        self._stop = threading.Event()
+        self._thread = None
+        self.is_leader = False
+        self.metrics = {name: {"runs": 0, "rows": 0, "last_rows": 0, "last_run_at": None, "last_duration_ms": None, "last_error": None} for name in TASKS}
+
+    @property
+    def owner(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def acquire_lease(self, db) -> bool:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        updated = db.query(models.SchedulerLease).filter(
+            models.SchedulerLease.name == LEASE_NAME,
+            or_(models.SchedulerLease.owner == self.owner, models.SchedulerLease.expires_at < now)
+        ).update({models.SchedulerLease.owner: self.owner, models.SchedulerLease.expires_at: expires_at}, synchronize_session=False)
+        if not updated:
+            exists = db.query(models.SchedulerLease.name).filter(models.SchedulerLease.name == LEASE_NAME).first()
+            if exists:
+                db.rollback()
+                return False
+            db.add(models.SchedulerLease(name=LEASE_NAME, owner=self.owner, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    def release_lease(self):
+        db = SessionLocal()
+        try:
+            db.query(models.SchedulerLease).filter(models.SchedulerLease.name == LEASE_NAME, models.SchedulerLease.owner == self.owner) \
+                .delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self.is_leader = False
+
+    def run_once(self):
+        db = SessionLocal()
+        try:
+            self.is_leader = self.acquire_lease(db)
+            if not self.is_leader:
+                return False
+            for name, task in TASKS.items():
+                metrics = self.metrics[name]
+                started = time.perf_counter()
+                try:
+                    rows = task(db, datetime.utcnow(), self.batch_size)
+                    metrics["rows"] += rows
+                    metrics["last_rows"] = rows
+                    metrics["last_error"] = None
+                except Exception as exc:
+                    db.rollback()
+                    metrics["last_error"] = repr(exc)
+                metrics["runs"] += 1
+                metrics["last_run_at"] = datetime.utcnow()
+                metrics["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return True
+        finally:
+            db.close()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                self.is_leader = False
+            self._stop.wait(self.interval_seconds)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="maintenance-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        if self.is_leader:
+            self.release_lease()
+
+    def snapshot(self):
+        return {
+            "owner": self.owner,
+            "is_leader": self.is_leader,
+            "interval_seconds": self.interval_seconds,
+            "batch_size": self.batch_size,
+            "tasks": self.metrics
+        }
+
+scheduler = MaintenanceScheduler(settings.MAINTENANCE_INTERVAL_SECONDS, settings.MAINTENANCE_BATCH_SIZE)
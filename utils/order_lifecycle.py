@@ -0,0 +1,63 @@
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import func
+import models
+from utils.analytics import record_status_changes
+
+PENDING = "Pending"
+PAID = "Paid"
+SHIPPED = "Shipped"
+DELIVERED = "Delivered"
+CANCELLED = "Cancelled"
+
+TRANSITIONS = {
+    PENDING: {PAID, CANCELLED},
+    PAID: {SHIPPED, CANCELLED},
+    SHIPPED: {DELIVERED},
+    DELIVERED: set(),
+    CANCELLED: set()
+}
+
+def validate_status(new_status: str):
+    if new_status not in TRANSITIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown order status {new_status}. Allowed: {', '.join(TRANSITIONS)}")
+
+def can_transition(old_status: str, new_status: str) -> bool:
+    return new_status in TRANSITIONS.get(old_status, set())
+
+def record_event(db, order_id: int, from_status, to_status: str, actor_id: int = None):
+    db.add(models.OrderEvent(order_id=order_id, from_status=from_status, to_status=to_status, actor_id=actor_id, created_at=datetime.utcnow()))
+
+def restore_stock(db, order_ids):
+    quantities = dict(
+        db.query(models.OrderItem.book_id, func.sum(models.OrderItem.quantity))
+        .filter(models.OrderItem.order_id.in_(order_ids))
+        .group_by(models.OrderItem.book_id).all()
+    )
+    if not quantities:
+        return
+    books = db.query(models.Book).filter(models.Book.id.in_(quantities)).with_for_update().all()
+    for book in books:
+        book.quantity += quantities[book.id]
+
+def transition_orders(db, order_ids, new_status: str, actor_id: int = None):
+    validate_status(new_status)
+    sources = [source for source, targets in TRANSITIONS.items() if new_status in targets]
+    orders = db.query(models.Order).filter(models.Order.id.in_(order_ids), models.Order.status.in_(sources)) \
+        .with_for_update().all()
+    if not orders:
+        return []
+
+    ids = [order.id for order in orders]
+    now = datetime.utcnow()
+    db.query(models.Order).filter(models.Order.id.in_(ids), models.Order.status.in_(sources)) \
+        .update({models.Order.status: new_status, models.Order.updated_at: now}, synchronize_session=False)
+    db.execute(models.OrderEvent.__table__.insert(), [
+        {"order_id": order.id, "from_status": order.status, "to_status": new_status, "actor_id": actor_id, "created_at": now}
+        for order in orders
+    ])
+
+    if new_status == CANCELLED:
+        restore_stock(db, ids)
+    record_status_changes(db, orders, new_status)
+    return ids
@@ -0,0 +1,129 @@
+from typing import NamedTuple, Optional
+import numpy as np
+import models
+from config import settings
+from utils.cache_version import VersionedCache
+from utils.commit_hooks import on_commit
+
+RULES_NAME = "price_rules"
+BASIS_POINTS = 10000
+DISCOUNT = "discount"
+TAX = "tax"
+RULE_KINDS = (DISCOUNT, TAX)
+
+def _normalize_code(code: Optional[str]) -> str:
+    return code.strip().upper() if code else ""
+
+def _table(pairs):
+    best = {}
+    for key, bp in pairs:
+        best[key] = max(bp, best.get(key, 0))
+    keys = np.array(sorted(best), dtype=np.int64)
+    return keys, np.array([best[key] for key in keys.tolist()], dtype=np.int64)
+
+def _lookup(keys, values, query, default):
+    if not len(keys):
+        return np.full(len(query), default, dtype=np.int64)
+    index = np.searchsorted(keys, query).clip(max=len(keys) - 1)
+    return np.where(keys[index] == query, values[index], default)
+
+class DiscountTable(NamedTuple):
+    book_ids: np.ndarray
+    book_bps: np.ndarray
+    genre_ids: np.ndarray
+    genre_bps: np.ndarray
+    global_bp: int
+
+    @classmethod
+    def build(cls, rules):
+        return cls(
+            *_table((rule.book_id, rule.percent_bp) for rule in rules if rule.book_id is not None),
+            *_table((rule.genre_id, rule.percent_bp) for rule in rules if rule.book_id is None and rule.genre_id is not None),
+            max([rule.percent_bp for rule in rules if rule.book_id is None and rule.genre_id is None], default=0)
+        )
+
+    def rates(self, book_ids, genre_ids):
+        return np.maximum.reduce([
+            _lookup(self.book_ids, self.book_bps, book_ids, 0),
+            _lookup(self.genre_ids, self.genre_bps, genre_ids, 0),
+            np.full(len(book_ids), self.global_bp, dtype=np.int64)
+        ])
+
+class PriceRules(NamedTuple):
+    version: int
+    discounts: DiscountTable
+    codes: dict
+    tax_genre_ids: np.ndarray
+    tax_genre_bps: np.ndarray
+    default_tax_bp: int
+
+    @classmethod
+    def build(cls, version: int, rules):
+        discounts = [rule for rule in rules if rule.kind == DISCOUNT]
+        taxes = [rule for rule in rules if rule.kind == TAX and rule.book_id is None and not rule.code]
+        codes = {}
+        for rule in discounts:
+            if rule.code:
+                codes.setdefault(_normalize_code(rule.code), []).append(rule)
+        return cls(
+            version,
+            DiscountTable.build([rule for rule in discounts if not rule.code]),
+            {code: DiscountTable.build(code_rules) for code, code_rules in codes.items()},
+            *_table((rule.genre_id, rule.percent_bp) for rule in taxes if rule.genre_id is not None),
+            max([rule.percent_bp for rule in taxes if rule.genre_id is None], default=0)
+        )
+
+    def discount_rates(self, book_ids, genre_ids, promo_codes):
+        rates = self.discounts.rates(book_ids, genre_ids)
+        for code in set(promo_codes.tolist()) - {""}:
+            table = self.codes.get(code)
+            if table is None:
+                continue
+            mask = promo_codes == code
+            rates[mask] = np.maximum(rates[mask], table.rates(book_ids[mask], genre_ids[mask]))
+        return rates
+
+    def tax_rates(self, genre_ids):
+        return _lookup(self.tax_genre_ids, self.tax_genre_bps, genre_ids, self.default_tax_bp)
+
+class PriceRuleBook(VersionedCache):
+    def _load(self, db, version: int) -> PriceRules:
+        return PriceRules.build(version, db.query(models.PriceRule).filter(models.PriceRule.active.is_(True)).all())
+
+price_rules = PriceRuleBook(RULES_NAME, settings.PRICE_RULES_CHECK_SECONDS)
+
+on_commit(models.PriceRule, ("id",), price_rules.invalidate)
+
+def price_lines(rules: PriceRules, book_ids, genre_ids, unit_prices, quantities, promo_codes):
+    subtotal = unit_prices * quantities
+    discount = subtotal * rules.discount_rates(book_ids, genre_ids, promo_codes) // BASIS_POINTS
+    net = subtotal - discount
+    tax = (net * rules.tax_rates(genre_ids) + BASIS_POINTS // 2) // BASIS_POINTS
+    return subtotal, discount, tax, net + tax
+
+def quote_carts(rules: PriceRules, carts):
+    sizes = np.array([len(lines) for lines, _ in carts], dtype=np.int64)
+    flat = [line for lines, _ in carts for line in lines]
+    book_ids, genre_ids, unit_prices, quantities = np.array(flat, dtype=np.int64).reshape(-1, 4).T
+    promo_codes = np.repeat(np.array([_normalize_code(promo_code) for _, promo_code in carts], dtype=object), sizes)
+    columns = price_lines(rules, book_ids, genre_ids, unit_prices, quantities, promo_codes)
+
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    sums = np.vstack([np.concatenate(([0], np.cumsum(values))) for values in columns])
+    totals = (sums[:, offsets[1:]] - sums[:, offsets[:-1]]).T.tolist()
+    lines = [
+        {"book_id": book_id, "quantity": quantity, "unit_price": unit_price,
+         "subtotal": subtotal, "discount": discount, "tax": tax, "total": total}
+        for book_id, quantity, unit_price, subtotal, discount, tax, total
+        in zip(*(column.tolist() for column in (book_ids, quantities, unit_prices) + columns))
+    ]
+
+    quotes = []
+    for position, (start, end) in enumerate(zip(offsets[:-1].tolist(), offsets[1:].tolist())):
+        subtotal, discount, tax, total = totals[position]
+        quotes.append({"lines": lines[start:end], "subtotal": subtotal, "discount": discount, "tax": tax, "total": total})
+    return quotes
+
+def quote_books(rules: PriceRules, books_and_quantities, promo_code: Optional[str] = None):
+    lines = [(book.id, book.genre_id or 0, book.price, quantity) for book, quantity in books_and_quantities]
+    return quote_carts(rules, [(lines, promo_code)])[0]
@@ -0,0 +1,164 @@
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import permutations, takewhile
+from sqlalchemy import func
+import models
+from config import get_settings
+from database import SessionLocal
+from utils.cache_version import current_version, set_version
+from utils.upsert import increment
+
+CURSOR_NAME = "recommendations_cursor"
+WRITE_CHUNK_BOOKS = 500
+
+def related_books(db, book_id: int, limit: int):
+    return db.query(models.BookRelated.related_id, models.Book.title, models.BookRelated.score) \
+        .join(models.Book, models.Book.id == models.BookRelated.related_id) \
+        .filter(models.BookRelated.book_id == book_id) \
+        .order_by(models.BookRelated.position).limit(limit).all()
+
+def refresh_top_k(db, book_ids, k: int):
+    book_ids = list(book_ids)
+    if not book_ids:
+        return
+    position = func.row_number().over(
+        partition_by=models.BookCopurchase.book_id,
+        order_by=(models.BookCopurchase.co_purchases.desc(), models.BookCopurchase.related_id)
+    ).label("position")
+    ranked = db.query(models.BookCopurchase.book_id, models.BookCopurchase.related_id, models.BookCopurchase.co_purchases, position) \
+        .filter(models.BookCopurchase.book_id.in_(book_ids)).subquery()
+    rows = db.query(ranked).filter(ranked.c.position <= k).all()
+
+    db.query(models.BookRelated).filter(models.BookRelated.book_id.in_(book_ids)).delete(synchronize_session=False)
+    if rows:
+        db.execute(models.BookRelated.__table__.insert(), [
+            {"book_id": book_id, "related_id": related_id, "score": score, "position": position}
+            for book_id, related_id, score, position in rows
+        ])
+
+def _settled_before(now=None):
+    return (now or datetime.utcnow()) - timedelta(seconds=get_settings().RECOMMENDATIONS_SETTLE_SECONDS)
+
+def _safe_cursor(db, cutoff):
+    unsettled = db.query(func.min(models.OrderEvent.id)).filter(models.OrderEvent.created_at >= cutoff).scalar()
+    if unsettled is not None:
+        return unsettled - 1
+    return db.query(func.max(models.OrderEvent.id)).scalar() or 0
+
+def apply_new_orders(db, now=None, batch_size: int = 500):
+    k = get_settings().RECOMMENDATIONS_TOP_K
+    cutoff = _settled_before(now)
+    processed = 0
+    while True:
+        cursor = current_version(db, CURSOR_NAME)
+        fetched = db.query(models.OrderEvent.id, models.OrderEvent.order_id, models.OrderEvent.created_at) \
+            .filter(models.OrderEvent.id > cursor, models.OrderEvent.from_status.is_(None)) \
+            .order_by(models.OrderEvent.id).limit(batch_size).all()
+        events = [(event_id, order_id) for event_id, order_id, created_at in takewhile(lambda event: event[2] < cutoff, fetched)]
+        if not events:
+            break
+
+        baskets = {}
+        items = db.query(models.OrderItem.order_id, models.OrderItem.book_id) \
+            .filter(models.OrderItem.order_id.in_([order_id for _, order_id in events]), models.OrderItem.book_id.isnot(None)).all()
+        for order_id, book_id in items:
+            baskets.setdefault(order_id, set()).add(book_id)
+
+        pairs = Counter()
+        for books in baskets.values():
+            pairs.update(permutations(sorted(books), 2))
+        increment(db, models.BookCopurchase.__table__,
+                  [{"book_id": book_id, "related_id": related_id, "co_purchases": count} for (book_id, related_id), count in pairs.items()],
+                  ("book_id", "related_id"), ("co_purchases",))
+        refresh_top_k(db, {book_id for book_id, _ in pairs}, k)
+
+        set_version(db, CURSOR_NAME, events[-1][0])
+        db.commit()
+        processed += len(events)
+        if len(events) < batch_size:
+            break
+    return processed
+
+def _co_occurrence(db, cursor: int):
+    import numpy as np
+    from scipy import sparse
+
+    late_orders = db.query(models.OrderEvent.order_id).filter(models.OrderEvent.id > cursor, models.OrderEvent.from_status.is_(None))
+    rows = db.query(models.OrderItem.order_id, models.OrderItem.book_id) \
+        .filter(models.OrderItem.book_id.isnot(None), models.OrderItem.order_id.notin_(late_orders)) \
+        .distinct().yield_per(50000)
+    pairs = np.array(list(rows), dtype=np.int64).reshape(-1, 2)
+    if not len(pairs):
+        return np.empty(0, dtype=np.int64), sparse.csr_matrix((0, 0), dtype=np.int64)
+
+    _, order_index = np.unique(pairs[:, 0], return_inverse=True)
+    book_ids, book_index = np.unique(pairs[:, 1], return_inverse=True)
+    purchases = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int64), (order_index, book_index)),
+        shape=(order_index.max() + 1, len(book_ids))
+    )
+    purchases.data[:] = 1
+    co_occurrence = (purchases.T @ purchases).tocsr()
+    co_occurrence.setdiag(0)
+    co_occurrence.eliminate_zeros()
+    return book_ids, co_occurrence
+
+def _top_k(co_occurrence, k: int):
+    import numpy as np
+
+    matrix = co_occurrence.tocoo()
+    order = np.lexsort((matrix.col, -matrix.data, matrix.row))
+    rows, cols, scores = matrix.row[order], matrix.col[order], matrix.data[order]
+    positions = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") + 1
+    keep = positions <= k
+    return rows[keep], cols[keep], scores[keep], positions[keep]
+
+def _replace_rows(db, model, columns, arrays):
+    import numpy as np
+
+    book_column = arrays[0]
+    books = np.unique(book_column)
+    for start in range(0, len(books), WRITE_CHUNK_BOOKS):
+        chunk = books[start:start + WRITE_CHUNK_BOOKS]
+        low = np.searchsorted(book_column, chunk[0], side="left")
+        high = np.searchsorted(book_column, chunk[-1], side="right")
+        db.query(model).filter(model.book_id.in_(chunk.tolist())).delete(synchronize_session=False)
+        db.execute(model.__table__.insert(), [
+            dict(zip(columns, (int(value) for value in values)))
+            for values in zip(*(array[low:high] for array in arrays))
+        ])
+        db.commit()
+
+    stale = sorted({row[0] for row in db.query(model.book_id).distinct()} - set(books.tolist()))
+    for start in range(0, len(stale), WRITE_CHUNK_BOOKS):
+        db.query(model).filter(model.book_id.in_(stale[start:start + WRITE_CHUNK_BOOKS])).delete(synchronize_session=False)
+        db.commit()
+
+def build(k: int = None):
+    k = k or get_settings().RECOMMENDATIONS_TOP_K
+    db = SessionLocal()
+    try:
+        cursor = _safe_cursor(db, _settled_before())
+        book_ids, co_occurrence = _co_occurrence(db, cursor)
+
+        matrix = co_occurrence.tocoo()
+        _replace_rows(db, models.BookCopurchase, ("book_id", "related_id", "co_purchases"),
+                      (book_ids[matrix.row], book_ids[matrix.col], matrix.data))
+        rows, cols, scores, positions = _top_k(co_occurrence, k)
+        _replace_rows(db, models.BookRelated, ("book_id", "related_id", "score", "position"),
+                      (book_ids[rows], book_ids[cols], scores, positions))
+
+        set_version(db, CURSOR_NAME, cursor)
+        db.commit()
+        return len(book_ids), matrix.nnz
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the customers-also-bought index from order history")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--top-k", type=int, default=None)
+    args = parser.parse_args()
+    books, pairs = build(args.top_k)
+    print(f"Indexed {pairs} co-purchase pairs across {books} books")
@@ -1,16 +1,14 @@
+from functools import lru_cache
 from fastapi_mail import FastMail, MessageSchema
-from config import conf
+from config import get_settings, get_mail_config
 from typing import List
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-url_link = os.getenv("URL_LINK")
-
-fm = FastMail(conf)
+@lru_cache
+def get_mail_client() -> FastMail:
+    return FastMail(get_mail_config())
 
 async def send_verification_email(email: str, token: str):
-    verify_link = f"{url_link}/verify/{token}"
+    verify_link = f"{get_settings().URL_LINK}/verify/{token}"
 
     html = f"""
     <h3>Welcome to Fern & Folio 📚</h3>
@@ -26,13 +24,17 @@ async def send_verification_email(email: str, token: str):
         subtype="html"
     )
 
-    await fm.send_message(message)
+    await get_mail_client().send_message(message)
 
-async def send_email_order(customer_name: str, order_id: int, total_amount: int, customer_email: str, order_list: List):
+async def send_email_order(customer_name: str, order_id: int, total_amount: int, customer_email: str, order_list: List,
+                           subtotal: int = None, discount: int = 0, tax: int = 0):
+    items = "".join(f"<li>{item['title']} x {item['quantity']}: {item['total']}</li>" for item in order_list)
     html = f"""
     <h3>Thank you for ordering from Fern & Folio 📚</h3>
     <p>Hey {customer_name}, thanks for ordering from Fern & Folio. Your order id {order_id} and total amount is {total_amount}. We’re preparing your books and will notify you once they're shipped.</p>
-    <p>Your order: {order_list}<p/>
+    <p>Your order:</p>
+    <ul>{items}</ul>
+    <p>Subtotal: {subtotal if subtotal is not None else total_amount}, discount: {discount}, tax: {tax}</p>
     <p>Happy Reading,
     Fern & Folio Team</p>
     """
@@ -45,4 +47,4 @@ async def send_email_order(customer_name: str, order_id: int, total_amount: int,
     )
 
 
-    await fm.send_message(message)
+    await get_mail_client().send_message(message)
@@ -0,0 +1,137 @@
+import hashlib
+import secrets
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from fastapi import HTTPException, status
+import models
+from config import settings
+from routers.authtoken import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
+from utils.cache_version import VersionedCache
+
+REVOCATIONS_NAME = "session_revocations"
+REVOCATION_WINDOW = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+def _hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+def _invalid_refresh_token():
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+class Revocations(NamedTuple):
+    version: int
+    session_ids: frozenset
+
+class RevocationList(VersionedCache):
+    def _load(self, db, version: int) -> Revocations:
+        cutoff = datetime.utcnow() - REVOCATION_WINDOW
+        rows = db.query(models.UserSession.id).filter(models.UserSession.revoked_at >= cutoff)
+        return Revocations(version, frozenset(row[0] for row in rows))
+
+    def is_revoked(self, session_id: str) -> bool:
+        return session_id in self.snapshot().session_ids
+
+revocation_list = RevocationList(REVOCATIONS_NAME, settings.SESSION_REVOCATION_CHECK_SECONDS)
+
+class SessionStore:
+    def __init__(self, max_entries: int, refresh_days: int):
+        self.max_entries = max_entries
+        self.refresh_lifetime = timedelta(days=refresh_days)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def _cache_get(self, session_id: str):
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                self._cache.move_to_end(session_id)
+            return entry
+
+    def _cache_put(self, session_id: str, entry):
+        with self._lock:
+            self._cache[session_id] = entry
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, predicate):
+        with self._lock:
+            for session_id in [session_id for session_id, entry in self._cache.items() if predicate(session_id, entry)]:
+                del self._cache[session_id]
+
+    def _tokens(self, session_id: str, user_id: int, role: str, secret: str):
+        return {
+            "access_token": create_access_token({"user_id": user_id, "role": role, "sid": session_id}),
+            "refresh_token": f"{session_id}.{secret}",
+            "token_type": "bearer"
+        }
+
+    def _session(self, db, session_id: str):
+        entry = self._cache_get(session_id)
+        if entry is None:
+            entry = db.query(models.UserSession.user_id, models.UserSession.role, models.UserSession.expires_at) \
+                .filter(models.UserSession.id == session_id, models.UserSession.revoked_at.is_(None)).first()
+            if entry is not None:
+                entry = tuple(entry)
+                self._cache_put(session_id, entry)
+        return entry
+
+    def create(self, db, user):
+        session_id = str(uuid.uuid4())
+        secret = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        expires_at = now + self.refresh_lifetime
+        db.add(models.UserSession(id=session_id, user_id=user.id, role=user.role, refresh_hash=_hash(secret),
+                                  created_at=now, expires_at=expires_at))
+        db.commit()
+        self._cache_put(session_id, (user.id, user.role, expires_at))
+        return self._tokens(session_id, user.id, user.role, secret)
+
+    def rotate(self, db, refresh_token: str):
+        session_id, _, secret = refresh_token.partition(".")
+        entry = self._session(db, session_id) if secret else None
+        now = datetime.utcnow()
+        if entry is None or entry[2] <= now:
+            raise _invalid_refresh_token()
+
+        new_secret = secrets.token_urlsafe(32)
+        presented = _hash(secret)
+        updated = db.query(models.UserSession).filter(
+            models.UserSession.id == session_id,
+            models.UserSession.refresh_hash == presented,
+            models.UserSession.revoked_at.is_(None),
+            models.UserSession.expires_at > now
+        ).update({models.UserSession.refresh_hash: _hash(new_secret), models.UserSession.previous_hash: presented}, synchronize_session=False)
+        if not updated:
+            reused = db.query(models.UserSession.id).filter(
+                models.UserSession.id == session_id, models.UserSession.previous_hash == presented
+            ).first()
+            db.rollback()
+            if reused:
+                self.revoke(db, session_id)
+            raise _invalid_refresh_token()
+        db.commit()
+        user_id, role, _ = entry
+        return self._tokens(session_id, user_id, role, new_secret)
+
+    def _revoke(self, db, condition):
+        revoked = db.query(models.UserSession).filter(condition, models.UserSession.revoked_at.is_(None)) \
+            .update({models.UserSession.revoked_at: datetime.utcnow()}, synchronize_session=False)
+        if revoked:
+            revocation_list.bump(db)
+        db.commit()
+        if revoked:
+            revocation_list.invalidate()
+        return revoked
+
+    def revoke(self, db, session_id: str):
+        self._cache_drop(lambda cached_id, entry: cached_id == session_id)
+        return self._revoke(db, models.UserSession.id == session_id)
+
+    def revoke_user(self, db, user_id: int):
+        self._cache_drop(lambda cached_id, entry: entry[0] == user_id)
+        return self._revoke(db, models.UserSession.user_id == user_id)
+
+session_store = SessionStore(settings.SESSION_CACHE_SIZE, settings.REFRESH_TOKEN_EXPIRE_DAYS)